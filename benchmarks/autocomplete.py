@@ -0,0 +1,78 @@
+"""
+Replays autocomplete keystrokes against the skin search index.
+
+Builds a synthetic catalog of 2,000 names shaped like VALORANT's ("<collection> <weapon>"), so the results don't
+depend on the network or on upstream data. Every name is typed one character at a time (plus a few typos), and
+each prefix is searched the way the autocomplete callback would. Compares the index against the old linear
+substring scan.
+
+    python -m benchmarks.autocomplete
+"""
+import random
+import statistics
+import time
+
+from utils.search import SearchIndex
+
+
+WEAPONS = [
+    "Classic", "Shorty", "Frenzy", "Ghost", "Sheriff", "Stinger", "Spectre", "Bucky", "Judge", "Bulldog",
+    "Guardian", "Phantom", "Vandal", "Marshal", "Outlaw", "Operator", "Ares", "Odin", "Knife",
+]
+SYLLABLES = [
+    "ar", "bel", "cor", "dra", "el", "fen", "gal", "hex", "ion", "jun", "kai", "lum", "mor", "nex", "ori",
+    "pri", "quan", "ru", "sol", "ta", "um", "val", "wyr", "xen", "yo", "zed",
+]
+
+
+def synthetic_names(count=2000, seed=0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        collection = " ".join(
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))).capitalize()
+            for _ in range(rng.randint(1, 2))
+        )
+        names.add(f"{collection} {rng.choice(WEAPONS)}")
+    return sorted(names)
+
+
+def keystrokes(names, samples=300, seed=0):
+    rng = random.Random(seed)
+    for name in rng.sample(names, min(samples, len(names))):
+        typed = name.lower()
+        if rng.random() < 0.2 and len(typed) > 4:  # drop a character to simulate a typo
+            i = rng.randrange(1, len(typed) - 1)
+            typed = typed[:i] + typed[i + 1:]
+        for i in range(1, len(typed) + 1):
+            yield typed[:i]
+
+
+def linear_scan(names, query):
+    return [name for name in names if query.lower() in name.lower()][:25]
+
+
+def bench(label, func, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        func(q)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    print(f"{label:<12} {len(timings)} queries  "
+          f"mean {statistics.mean(timings):8.1f}us  p50 {timings[len(timings) // 2]:8.1f}us  "
+          f"p99 {timings[int(len(timings) * 0.99)]:8.1f}us")
+
+
+def main():
+    names = synthetic_names()
+    start = time.perf_counter()
+    index = SearchIndex.from_names(names)
+    print(f"Indexed {len(names)} skins in {(time.perf_counter() - start) * 1000:.1f}ms")
+    queries = list(keystrokes(names))
+    bench("index", index.search, queries)
+    bench("linear scan", lambda q: linear_scan(names, q), queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares loading the skin catalog with eager and lazy decoding of the levels/chromas JSON.
+
+Builds synthetic ``skins`` rows shaped like the real ones. "eager" is the previous behaviour: pretty-printed
+JSON decoded with the standard library for every row. "lazy" is the current GunSkin, which keeps the compact
+JSON text until a variant is shown. Also times decoding the variants of a single skin on first access.
+
+    python -m benchmarks.skin_decoding
+"""
+import json
+import statistics
+import time
+import uuid
+
+from utils import jsoncodec
+from utils.catalog import SkinCatalog
+from utils.specialobjects import GunSkin
+
+
+def make_variants(name):
+    levels = [
+        {"uuid": str(uuid.uuid4()), "name": f"{name} Level {i}", "levelItem": " - VFX", "video": f"https://valorant-api.com/{uuid.uuid4()}.mp4",
+         "displayIcon": f"https://media.valorant-api.com/weaponskinlevels/{uuid.uuid4()}/displayicon.png"}
+        for i in range(1, 5)
+    ]
+    chromas = [
+        {"uuid": str(uuid.uuid4()), "name": name, "level": None, "chroma_name": f"Variant {i}",
+         "displayIcon": f"https://media.valorant-api.com/weaponskinchromas/{uuid.uuid4()}/displayicon.png", "video": None}
+        for i in range(1, 5)
+    ]
+    return levels, chromas
+
+
+def make_rows(count=2000, pretty=True):
+    rows = []
+    for i in range(count):
+        name = f"Skin {i} Vandal"
+        levels, chromas = make_variants(name)
+        dump = (lambda v: json.dumps(v, indent=2)) if pretty else (lambda v: jsoncodec.dumps(v).decode("utf-8"))
+        rows.append({"uuid": str(uuid.uuid4()), "displayname": name, "cost": 1775, "displayicon": None,
+                     "contenttieruuid": str(uuid.uuid4()), "levels": dump(levels), "chromas": dump(chromas)})
+    return rows
+
+
+class EagerGunSkin(GunSkin):
+    __slots__ = ()
+
+    def from_record(self, record):
+        super().from_record(record)
+        self.chromas = json.loads(record.get('chromas'))
+        self.levels = json.loads(record.get('levels'))
+        return self
+
+
+def timeit(func, repeat=15):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    pretty_rows = make_rows(pretty=True)
+    compact_rows = make_rows(pretty=False)
+    eager = timeit(lambda: SkinCatalog(EagerGunSkin().from_record(r) for r in pretty_rows))
+    lazy = timeit(lambda: SkinCatalog(GunSkin().from_record(r) for r in compact_rows))
+    first_access = timeit(lambda: [GunSkin().from_record(r).chromas for r in compact_rows[:100]]) / 100
+    pretty_size = sum(len(r["levels"]) + len(r["chromas"]) for r in pretty_rows)
+    compact_size = sum(len(r["levels"]) + len(r["chromas"]) for r in compact_rows)
+    print(f"json library      {'orjson' if jsoncodec.orjson is not None else 'json (install orjson for faster decoding)'}")
+    print(f"rows              {len(pretty_rows)}")
+    print(f"stored JSON       {pretty_size / 1024:.0f} KiB pretty, {compact_size / 1024:.0f} KiB compact")
+    print(f"catalog, eager    {eager:.1f} ms")
+    print(f"catalog, lazy     {lazy:.1f} ms ({eager / lazy:.1f}x faster)")
+    print(f"first variant use {first_access * 1000:.1f} us per skin")
+
+
+if __name__ == '__main__':
+    main()
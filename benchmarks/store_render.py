@@ -0,0 +1,118 @@
+"""
+Measures the store picture renderer.
+
+Draws synthetic stores of four skins, with icons shaped like valorant-api.com's (wide transparent PNGs). Reports
+the time to draw one store, the throughput of the process pool for a burst of stores and how late a 5 ms
+timer fires on the event loop while the burst is drawn inline versus in the pool, which is what the gateway
+would see. Also times a picture served from the LRU.
+
+    python -m benchmarks.store_render
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from utils.cache import LRUCache
+from utils.store_image import StoreCard, render_store_image
+
+TIER_COLORS = [6071267, 13188655, 16182852, 15357273, 10920869]
+
+
+def make_icon(seed: int) -> bytes:
+    rng = random.Random(seed)
+    icon = Image.new("RGBA", (1024, 256), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(icon)
+    for _ in range(40):
+        x, y = rng.randrange(0, 900), rng.randrange(40, 200)
+        draw.rectangle((x, y, x + rng.randrange(20, 120), y + rng.randrange(8, 40)),
+                       fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+    out = io.BytesIO()
+    icon.save(out, format="PNG")
+    return out.getvalue()
+
+
+def make_stores(count: int, icons: list) -> list:
+    rng = random.Random(0)
+    stores = []
+    for i in range(count):
+        stores.append([
+            StoreCard(f"Synthetic Skin {i}-{j} Vandal", rng.choice(icons), rng.choice(TIER_COLORS), 1775,
+                      f"€ {rng.uniform(10, 30):.2f}", wishlisted=rng.random() < 0.1)
+            for j in range(4)
+        ])
+    return stores
+
+
+async def timer_lateness(work) -> tuple:
+    """Runs ``work`` while a 5 ms timer ticks and returns (seconds taken, worst lateness of the timer in ms)."""
+    lateness = []
+    done = asyncio.Event()
+
+    async def tick():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lateness.append((time.perf_counter() - started - 0.005) * 1000)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+    return elapsed, max(lateness, default=0)
+
+
+async def main():
+    icons = [make_icon(i) for i in range(24)]
+    stores = make_stores(32, icons)
+    print(f"cpus              {os.cpu_count()}")
+    print(f"image size        {len(render_store_image(stores[0])) / 1024:.0f} KiB")
+
+    samples = []
+    for store in stores[:10]:
+        started = time.perf_counter()
+        render_store_image(store)
+        samples.append(time.perf_counter() - started)
+    print(f"one store         {statistics.median(samples) * 1000:.1f} ms")
+
+    async def inline():
+        for store in stores:
+            render_store_image(store)
+            # as if every store was drawn by a separate command handler
+            await asyncio.sleep(0)
+
+    elapsed, late = await timer_lateness(inline)
+    print(f"inline            {len(stores) / elapsed:.1f} stores/s, timer up to {late:.0f} ms late")
+
+    loop = asyncio.get_running_loop()
+    for workers in (1, 2, 4):
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # start the workers and import Pillow before timing
+            await asyncio.gather(*[loop.run_in_executor(pool, render_store_image, stores[0]) for _ in range(workers)])
+
+            async def pooled():
+                await asyncio.gather(*[loop.run_in_executor(pool, render_store_image, store) for store in stores])
+
+            elapsed, late = await timer_lateness(pooled)
+        print(f"pool, {workers} worker{'s' if workers > 1 else ' '} {len(stores) / elapsed:.1f} stores/s, timer up to {late:.0f} ms late")
+
+    cache = LRUCache(128)
+    key = tuple((card.name, card.price, card.local_price, card.wishlisted) for card in stores[0])
+    cache.set(key, render_store_image(stores[0]))
+    started = time.perf_counter()
+    for _ in range(10000):
+        cache.get(tuple((card.name, card.price, card.local_price, card.wishlisted) for card in stores[0]))
+    print(f"cached            {(time.perf_counter() - started) / 10000 * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
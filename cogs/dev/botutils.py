@@ -28,16 +28,14 @@ class BotUtils(commands.Cog):
         elif url is not None:
             if url.startswith("<") and url.endswith(">"):
                 url = url[1:-1]
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(url) as r:
-                        data = await r.read()
-                except aiohttp.InvalidURL:
-                    await ctx.crossmark()
-                    return await ctx.send("That URL is invalid.")
-                except aiohttp.ClientError:
-                    await ctx.crossmark()
-                    return await ctx.send("Something went wrong while trying to get the image.")
+            try:
+                data = await self.client.media.get(url)
+            except aiohttp.InvalidURL:
+                await ctx.crossmark()
+                return await ctx.send("That URL is invalid.")
+            except aiohttp.ClientError:
+                await ctx.crossmark()
+                return await ctx.send("Something went wrong while trying to get the image.")
         else:
             await ctx.crossmark()
             return await ctx.send("I need either an attachment or an image URL.")
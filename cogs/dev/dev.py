@@ -26,10 +26,13 @@ import traceback
 import contextlib
 from abc import ABC
 
+from cogs.maincommands.database import DBManager
 from main import clvt
 from utils import checks
 from utils.helper import DynamicUpdater, range_char
-from utils.specialobjects import UserSetting
+from utils.ratelimit import riot_ratelimiter
+from utils.assets import assets
+from utils.cache import user_settings_cache
 from .status import Status
 from .botutils import BotUtils
 from .autostatus import AutoStatus
@@ -52,11 +55,7 @@ class RemindNightMarket(discord.ui.View):
     async def remind_night_market(self, button: discord.ui.Button, interaction: discord.Interaction):
         button.disabled = True
         button.style = discord.ButtonStyle.grey
-        usr_se_db = await interaction.client.db.fetchrow("SELECT * FROM user_settings WHERE user_id = $1", interaction.user.id)
-        if usr_se_db is None:
-            await interaction.client.db.execute("INSERT INTO user_settings(user_id) VALUES ($1)", interaction.user.id)
-            usr_se_db = await interaction.client.db.fetchrow("SELECT * FROM user_settings WHERE user_id = $1", interaction.user.id)
-        usr_se = UserSetting(usr_se_db)
+        usr_se = await DBManager(interaction.client.db).fetch_user_settings(interaction.user.id)
         usr_se.nm_reminder = True
         await usr_se.update(interaction.client)
         await interaction.response.send_message("You will be reminded when the Night Market opens!", ephemeral=True)
@@ -80,10 +79,7 @@ class SelectCurrency(discord.ui.Select):
         self.currency_range = []
         self.all_currency_options = []
 
-        with open('assets/currencies.json') as f:
-            currencies = json.load(f)
-        for currency in currencies['data']:
-            currency_data = currencies['data'][currency]
+        for currency, currency_data in assets.currencies.items():
             vp_per_dollar = currency_data['vp_per_dollar']
             name = currency_data['name']
             symbol = currency_data['symbol']
@@ -142,6 +138,7 @@ class SelectCurrency(discord.ui.Select):
             self.currency_range = range_char(first_letter, last_letter)
         else:
             await interaction.client.db.execute("INSERT INTO user_settings(user_id, currency) VALUES ($1, $2) ON CONFLICT (user_id) DO UPDATE SET currency = $2", interaction.user.id, self.values[0])
+            user_settings_cache.pop(interaction.user.id)
             self.disabled = True
         self.update_options(self.values[0])
         await interaction.response.edit_message(view=self.view)
@@ -428,6 +425,41 @@ class Developer(AutoStatus, BotUtils, Status, commands.Cog, name='dev', command_
         msg = f'{render}'
         await ctx.send_interactive(self.get_sql(msg))
 
+    @checks.dev()
+    @commands.command(name="ratelimits", hidden=True)
+    async def ratelimits(self, ctx):
+        """
+        Shows queue depth and wait times of the Riot API rate limiter.
+        """
+        metrics = riot_ratelimiter.metrics()
+        if len(metrics) == 0:
+            return await ctx.send("No Riot requests have been made yet.")
+        table = TabularData()
+        table.set_columns(["bucket", "queued", "requests", "avg wait", "max wait", "429s"])
+        table.add_rows(
+            [bucket, m["queued"], m["requests"], f"{m['avg_wait']:.2f}s", f"{m['max_wait']:.2f}s", m["rejections"]]
+            for bucket, m in metrics.items()
+        )
+        msg = f'{table.render()}\n*Fleet slowdown: x{riot_ratelimiter.slowdown:.2f}*'
+        await ctx.send_interactive(self.get_sql(msg))
+
+    @checks.dev()
+    @commands.command(name="rotatekeys", hidden=True)
+    async def rotate_keys(self, ctx):
+        """
+        Re-encrypts every stored password with the first key in FERNET_KEY.
+        Run after adding a new key in front of the old one, the old key can be removed once this is done.
+        """
+        c = confirm(ctx, self.client, 30.0)
+        c.response = await ctx.send("Re-encrypt every stored password with the primary key?", view=c)
+        await c.wait()
+        if c.returning_value is not True:
+            return
+        async with ctx.typing():
+            rotated = await DBManager(self.client.db).rotate_passwords()
+        await ctx.checkmark()
+        await ctx.send(f"Re-encrypted {comma_number(rotated)} passwords.")
+
     @checks.dev()
     @commands.command(name="dsay", aliases=["decho"])
     async def d_say(self, ctx, channel: Optional[discord.TextChannel], *, message = None):
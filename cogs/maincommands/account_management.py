@@ -72,7 +72,7 @@ class AccountManagement(commands.Cog):
                                      ephemeral=True)
         await ctx.defer(ephemeral=True)
         try:
-            auth = riot_authorization.RiotAuth()
+            auth = riot_authorization.RiotAuth(self.client.riot_auth_transport)
             await auth.authorize(username, password)
         except riot_authorization.Exceptions.RiotAuthenticationError:
             await ctx.respond(embed=authentication_error(True))
@@ -84,6 +84,8 @@ class AccountManagement(commands.Cog):
             return
         except riot_authorization.Exceptions.RiotMultifactorError:
             pass
+        else:
+            await self.client.riot_sessions.save(ctx.author.id, username, auth)
         # All other exceptions will be handled by global
         # Add to database
         await self.dbManager.add_user(ctx.author.id, username, password, reg_code)
@@ -106,6 +108,7 @@ class AccountManagement(commands.Cog):
         await c.wait()
         if c.returning_value is True:
             await self.client.db.execute("DELETE FROM valorant_login WHERE user_id = $1", ctx.author.id)
+            await self.client.riot_sessions.invalidate(ctx.author.id)
             await ctx.respond(embed=user_logged_out(riot_account.username), ephemeral=True)
 
     @commands.slash_command(name="update-password",
@@ -131,7 +134,7 @@ class AccountManagement(commands.Cog):
         if c.returning_value is True:
             e = await ctx.respond(embed=updating_password(riot_account.username, 1), ephemeral=True)
             try:
-                auth = riot_authorization.RiotAuth()
+                auth = riot_authorization.RiotAuth(self.client.riot_auth_transport)
                 await auth.authorize(riot_account.username, password)
             except riot_authorization.Exceptions.RiotAuthenticationError:
                 await e.edit(embed=authentication_error(True))
@@ -147,6 +150,7 @@ class AccountManagement(commands.Cog):
             # Update password
             print("Updating account details to database...")
             await self.dbManager.update_password(riot_account.username, password)
+            await self.client.riot_sessions.invalidate(ctx.author.id)
             await e.edit(embed=user_updated(riot_account.username))
         print("Updated account details to database")
         return
@@ -180,8 +184,7 @@ class AccountManagement(commands.Cog):
         else:
             return await ctx.respond(embed=no_logged_in_account(), ephemeral=True)
         try:
-            auth = riot_authorization.RiotAuth()
-            await auth.authorize(riot_account.username, riot_account.password, multifactor_code=multifactor_code)
+            auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password, multifactor_code=multifactor_code)
         except riot_authorization.Exceptions.RiotAuthenticationError:
             await ctx.respond(embed=authentication_error())
             print("Authentication error")
@@ -1,25 +1,50 @@
+import copy
 import datetime
+import hashlib
+import json
 import time
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 import discord
 import asyncpg
-from cryptography.fernet import Fernet
-from dotenv import load_dotenv
 
 from utils import get_store
-from utils.specialobjects import RiotUser, GunSkin, ReminderConfig, UserSetting, NightMarketGunSkin, Accessory
-import os
+from utils.cache import LRUCache, reminder_config_cache, user_settings_cache
+from utils.catalog import SkinCatalog
+from utils.credentials import credential_vault
+from utils.prices import price_table
+from utils.search import SearchIndex
+from utils.singleflight import SingleFlight
+from utils.wishlist import WishlistMatches
+from utils.specialobjects import RiotUser, GunSkin, ReminderConfig, UserSetting, NightMarketGunSkin, Accessory, AccessoryType, UserContext
 
-load_dotenv()
-FERNET_KEY = os.getenv("FERNET_KEY")
+
+def content_hash(*values) -> str:
+    return hashlib.sha1(json.dumps(values, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def skin_content_hash(skin: GunSkin) -> str:
+    return content_hash(skin.uuid, skin.displayName, skin.cost, skin.displayIcon, skin.contentTierUUID, skin.levels, skin.chromas)
 
 
 class DBManager:
-    def __init__(self, pool_pg):
+    # shared by every DBManager so that cogs and persistent views coalesce on the same store fetch
+    _store_flights = SingleFlight()
+    # swapped as a whole by load_skin_catalog, lookups fall back to the database until it is first loaded
+    skin_catalog: Optional[SkinCatalog] = None
+    accessory_search: Optional[SearchIndex] = None
+    wishlist_matches: Optional[WishlistMatches] = None
+    # theme uuid -> (name, display icon), swapped as a whole by load_themes
+    themes: Optional[Mapping[str, tuple[str, Optional[str]]]] = None
+
+    def __init__(self, pool_pg, store_client: Optional[get_store.StoreClient] = None):
         self.pool_pg: asyncpg.Pool = pool_pg
+        self.store_client = store_client
+        # interaction id -> (loaded at, context)
+        self._user_contexts = LRUCache(512)
 
     async def check_user_existence(self, username):
-        return bool(await self.get_user_by_username(username))
+        return await self.pool_pg.fetchval("SELECT EXISTS(SELECT 1 FROM valorant_login WHERE username = $1)", username)
 
     async def add_user(self, user_id, username, password, region):
         if not await self.check_user_existence(username):
@@ -29,12 +54,17 @@ class DBManager:
         return False
 
     def encrypt_password(self, password):
-        password = Fernet(FERNET_KEY).encrypt(password.encode("utf-8"))
-        return password
+        return credential_vault.encrypt_password(password)
 
     def decrypt_password(self, password):
-        password = (Fernet(FERNET_KEY).decrypt(password)).decode("utf-8")
-        return password
+        return credential_vault.decrypt_password(password)
+
+    async def rotate_passwords(self) -> int:
+        """Re-encrypts every stored password with the primary key, run after adding a new key to FERNET_KEY."""
+        records = await self.pool_pg.fetch("SELECT user_id, password FROM valorant_login")
+        rotated = [(r.get("user_id"), credential_vault.rotate(r.get("password"))) for r in records]
+        await self.pool_pg.executemany("UPDATE valorant_login SET password = $2 WHERE user_id = $1", rotated)
+        return len(rotated)
 
     async def update_password(self, username, password):
         if await self.check_user_existence(username):
@@ -47,23 +77,151 @@ class DBManager:
         user = await self.pool_pg.fetchrow("SELECT * FROM valorant_login WHERE username = $1", username)
         if user is None:
             return False
-        user_obj = RiotUser(user)
-        user_obj.password = self.decrypt_password(user_obj.password)
-        return user_obj
+        return RiotUser(user)
 
     async def get_user_by_user_id(self, user_id):
         user = await self.pool_pg.fetchrow("SELECT * FROM valorant_login WHERE user_id = $1", user_id)
         if user is None:
             return False
-        user_obj = RiotUser(user)
-        user_obj.password = self.decrypt_password(user_obj.password)
-        return user_obj
+        return RiotUser(user)
+
+    async def get_user_context(self, interaction: discord.Interaction, store_date: Optional[datetime.date] = None) -> UserContext:
+        """
+        Loads the user's account, settings, reminder config, wishlist, dev flag and today's cached and one time
+        stores in a single query. The result is kept for the lifetime of the interaction.
+        """
+        cached = self._user_contexts.get(interaction.id)
+        # interaction tokens are valid for 15 minutes, nothing should need the context after that
+        if cached is not None and time.monotonic() - cached[0] < 900:
+            return cached[1]
+        store_date = store_date or discord.utils.utcnow().date()
+        record = await self.pool_pg.fetchrow(
+            "SELECT "
+            "(SELECT v FROM valorant_login v WHERE v.user_id = $1) AS account, "
+            "(SELECT s FROM user_settings s WHERE s.user_id = $1) AS settings, "
+            "(SELECT r FROM store_reminder r WHERE r.user_id = $1) AS reminder, "
+            "ARRAY(SELECT w.skin_uuid FROM wishlist w WHERE w.user_id = $1) AS wishlist, "
+            "(SELECT d.enabled FROM devmode d WHERE d.user_id = $1 AND d.enabled IS NOT NULL LIMIT 1) AS is_dev, "
+            "(SELECT c FROM cached_stores c WHERE c.store_date = $2 AND c.username = (SELECT username FROM valorant_login WHERE user_id = $1) LIMIT 1) AS cached_store, "
+            "(SELECT o FROM onetimestores o WHERE o.user_id = $1 LIMIT 1) AS onetimestore",
+            interaction.user.id, store_date
+        )
+        context = UserContext(interaction.user.id, record)
+        self._user_contexts.set(interaction.id, (time.monotonic(), context))
+        return context
 
     async def get_all_users(self):
         users = await self.pool_pg.fetch("SELECT * FROM valorant_login")
         return [RiotUser(user) for user in users]
 
+    async def load_skin_catalog(self) -> SkinCatalog:
+        all_skins_raw = await self.pool_pg.fetch("SELECT * FROM skins")
+        catalog = SkinCatalog(GunSkin().from_record(skin) for skin in all_skins_raw)
+        DBManager.skin_catalog = catalog
+        price_table.set_costs(skin.cost for skin in catalog.skins)
+        return catalog
+
+    async def merge_skins(self, skins: list[GunSkin]) -> tuple[int, int, int]:
+        """
+        Writes only the skins whose content changed since the catalog was loaded, via COPY into a staging table
+        and a single upsert. Returns the number of rows inserted, updated and left unchanged.
+        """
+        skins = list({skin.uuid: skin for skin in skins}.values())
+        catalog = self.skin_catalog or await self.load_skin_catalog()
+        existing = {skin.uuid: skin_content_hash(skin) for skin in catalog.skins}
+        changed = [skin for skin in skins if existing.get(skin.uuid) != skin_content_hash(skin)]
+        if len(changed) == 0:
+            return 0, 0, len(skins)
+        records = [
+            (skin.uuid, skin.displayName, skin.cost, skin.displayIcon, skin.contentTierUUID, skin.levels, skin.chromas)
+            for skin in changed
+        ]
+        async with self.pool_pg.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("CREATE TEMP TABLE skins_staging (LIKE skins INCLUDING DEFAULTS) ON COMMIT DROP")
+                await conn.copy_records_to_table(
+                    "skins_staging", records=records,
+                    columns=["uuid", "displayname", "cost", "displayicon", "contenttieruuid", "levels", "chromas"]
+                )
+                results = await conn.fetch(
+                    "INSERT INTO skins(uuid, displayname, cost, displayicon, contenttieruuid, levels, chromas) "
+                    "SELECT uuid, displayname, cost, displayicon, contenttieruuid, levels, chromas FROM skins_staging "
+                    "ON CONFLICT(uuid) DO UPDATE SET displayname = EXCLUDED.displayname, cost = EXCLUDED.cost, "
+                    "displayicon = EXCLUDED.displayicon, contenttieruuid = EXCLUDED.contenttieruuid, "
+                    "levels = EXCLUDED.levels, chromas = EXCLUDED.chromas "
+                    "RETURNING (xmax = 0) AS inserted"
+                )
+        inserted = sum(1 for r in results if r.get("inserted"))
+        return inserted, len(results) - inserted, len(skins) - len(changed)
+
+    async def merge_accessories(self, accessories: list[tuple]) -> tuple[int, int, int]:
+        """
+        Same as :meth:`merge_skins` for rows of
+        ``(uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type)``.
+        """
+        accessories = list({acc[0]: acc for acc in accessories}.values())
+        columns = ["uuid", "name", "theme_uuid", "display_title", "display_img", "wide_img", "long_img", "type"]
+        existing_raw = await self.pool_pg.fetch(f"SELECT {', '.join(columns)} FROM accessories")
+        existing = {r.get("uuid"): content_hash(*r.values()) for r in existing_raw}
+        changed = [acc for acc in accessories if existing.get(acc[0]) != content_hash(*acc)]
+        if len(changed) == 0:
+            return 0, 0, len(accessories)
+        async with self.pool_pg.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("CREATE TEMP TABLE accessories_staging (LIKE accessories INCLUDING DEFAULTS) ON COMMIT DROP")
+                await conn.copy_records_to_table("accessories_staging", records=changed, columns=columns)
+                results = await conn.fetch(
+                    f"INSERT INTO accessories({', '.join(columns)}) SELECT {', '.join(columns)} FROM accessories_staging "
+                    f"ON CONFLICT(uuid) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in columns[1:])} "
+                    "RETURNING (xmax = 0) AS inserted"
+                )
+        inserted = sum(1 for r in results if r.get("inserted"))
+        return inserted, len(results) - inserted, len(accessories) - len(changed)
+
+    async def load_themes(self) -> Mapping[str, tuple[str, Optional[str]]]:
+        records = await self.pool_pg.fetch("SELECT uuid, name, display_icon FROM themes")
+        themes = MappingProxyType({r.get("uuid"): (r.get("name"), r.get("display_icon")) for r in records})
+        DBManager.themes = themes
+        return themes
+
+    async def merge_themes(self, themes: list[tuple]) -> int:
+        """Upserts the rows of ``(uuid, name, display_icon)`` that changed and returns how many were written."""
+        existing = self.themes if self.themes is not None else await self.load_themes()
+        changed = [theme for theme in {theme[0]: theme for theme in themes}.values() if existing.get(theme[0]) != tuple(theme[1:])]
+        if len(changed) > 0:
+            await self.pool_pg.executemany(
+                "INSERT INTO themes(uuid, name, display_icon) VALUES ($1, $2, $3) "
+                "ON CONFLICT(uuid) DO UPDATE SET name = EXCLUDED.name, display_icon = EXCLUDED.display_icon",
+                changed
+            )
+        return len(changed)
+
+    def get_theme_name(self, theme_uuid: Optional[str]) -> Optional[str]:
+        if theme_uuid is None or self.themes is None:
+            return None
+        theme = self.themes.get(theme_uuid)
+        return theme[0] if theme is not None else None
+
+    async def get_catalog_sources(self) -> dict[str, asyncpg.Record]:
+        """The HTTP validators and client version stored by the last successful catalog refresh, keyed by URL."""
+        records = await self.pool_pg.fetch("SELECT url, etag, last_modified, client_version FROM catalog_sources")
+        return {r.get("url"): r for r in records}
+
+    async def save_catalog_source(self, url: str, etag: Optional[str], last_modified: Optional[str], client_version: str):
+        await self.pool_pg.execute(
+            "INSERT INTO catalog_sources(url, etag, last_modified, client_version, fetched_at) VALUES ($1, $2, $3, $4, now()) "
+            "ON CONFLICT(url) DO UPDATE SET etag = $2, last_modified = $3, client_version = $4, fetched_at = now()",
+            url, etag, last_modified, client_version
+        )
+
+    async def search_skins(self, query: str, limit: int = 25) -> list[str]:
+        if self.skin_catalog is None:
+            await self.load_skin_catalog()
+        return self.skin_catalog.search_index.search(query, limit)
+
     async def get_all_skins(self) -> list[GunSkin]:
+        if self.skin_catalog is not None:
+            return list(self.skin_catalog.skins)
         all_skins_raw = await self.pool_pg.fetch("SELECT * FROM skins")
         skins = []
         for skin in all_skins_raw:
@@ -72,6 +230,9 @@ class DBManager:
         return skins
 
     async def get_nightmarket_skin(self, uuid):
+        if self.skin_catalog is not None:
+            skin = self.skin_catalog.get_by_name_or_uuid(uuid)
+            return NightMarketGunSkin().from_skin(skin) if skin is not None else False
         gun_skin = await self.pool_pg.fetchrow("SELECT * FROM skins WHERE LOWER(displayname) = $1 OR LOWER(uuid) = $1", uuid.lower())
         if gun_skin is None:
             return False
@@ -79,12 +240,16 @@ class DBManager:
         return discounted_gun_skin
 
     async def get_skin_by_name_or_uuid(self, skin_name) -> GunSkin:
+        if self.skin_catalog is not None:
+            return self.skin_catalog.get_by_name_or_uuid(skin_name) or False
         skin = await self.pool_pg.fetchrow("SELECT * FROM skins WHERE LOWER(displayname) = $1 OR LOWER(uuid) = $1", skin_name.lower())
         if skin is None:
             return False
         return GunSkin().from_record(skin)
     
     async def get_skin_by_uuid(self, skin_uuid) -> GunSkin:
+        if self.skin_catalog is not None:
+            return self.skin_catalog.get(skin_uuid) or False
         skin = await self.pool_pg.fetchrow("SELECT * FROM skins WHERE uuid = $1", skin_uuid)
         if skin is None:
             return False
@@ -97,9 +262,11 @@ class DBManager:
     async def add_skin_to_wishlist(self, user_id, skin_uuid):
         if not await self.get_skin_by_uuid(skin_uuid):
             return False
-        if skin_uuid in await self.get_user_wishlist(user_id):
+        inserted = await self.pool_pg.fetchval("INSERT INTO wishlist (user_id, skin_uuid) VALUES ($1, $2) ON CONFLICT DO NOTHING RETURNING true", user_id, skin_uuid)
+        if inserted is not True:
             return False
-        await self.pool_pg.fetchval("INSERT INTO wishlist (user_id, skin_uuid) VALUES ($1, $2)", user_id, skin_uuid)
+        if self.wishlist_matches is not None:
+            self.wishlist_matches.invalidate(user_id)
         return True
 
     async def remove_skin_from_wishlist(self, user_id, skin_uuid):
@@ -108,30 +275,126 @@ class DBManager:
         if skin_uuid not in await self.get_user_wishlist(user_id):
             return False
         await self.pool_pg.fetchval("DELETE FROM wishlist WHERE user_id = $1 AND skin_uuid = $2", user_id, skin_uuid)
+        if self.wishlist_matches is not None:
+            self.wishlist_matches.invalidate(user_id)
         return True
 
+    async def load_wishlist_matches(self, store_date: datetime.date) -> WishlistMatches:
+        """Matches every cached store of ``store_date`` against the wishlists in one query."""
+        # only the store of the currently linked account, an account unlinked during the day leaves its row behind
+        records = await self.pool_pg.fetch(
+            "SELECT c.user_id, ARRAY[c.skin1_uuid, c.skin2_uuid, c.skin3_uuid, c.skin4_uuid] AS store, "
+            "array_remove(array_agg(w.skin_uuid), NULL) AS matches FROM cached_stores c "
+            "JOIN valorant_login v ON v.user_id = c.user_id AND v.username = c.username "
+            "LEFT JOIN wishlist w ON w.user_id = c.user_id AND w.skin_uuid IN (c.skin1_uuid, c.skin2_uuid, c.skin3_uuid, c.skin4_uuid) "
+            "WHERE c.store_date = $1 GROUP BY c.user_id, c.skin1_uuid, c.skin2_uuid, c.skin3_uuid, c.skin4_uuid",
+            store_date
+        )
+        matches = WishlistMatches(store_date, ((r.get("user_id"), r.get("store"), r.get("matches")) for r in records))
+        DBManager.wishlist_matches = matches
+        return matches
+
+    async def get_wishlisted_skins(self, user_id, skin_uuids: list[str], store_date: Optional[datetime.date] = None) -> set[str]:
+        """The skins among ``skin_uuids`` that are on the user's wishlist, answered from the day's matches when possible."""
+        store_date = store_date or discord.utils.utcnow().date()
+        matches = self.wishlist_matches
+        if matches is not None and matches.store_date == store_date and matches.covers(user_id, skin_uuids):
+            return set(matches.for_user(user_id).intersection(skin_uuids))
+        return set(await self.get_user_wishlist(user_id)).intersection(skin_uuids)
+
+    async def _fetch_or_create(self, table: str, user_id):
+        # the insert only returns a row when it created one, the union falls back to the existing row
+        record = await self.pool_pg.fetchrow(
+            f"WITH created AS (INSERT INTO {table}(user_id) VALUES ($1) ON CONFLICT (user_id) DO NOTHING RETURNING *) "
+            f"SELECT * FROM created UNION ALL SELECT * FROM {table} WHERE user_id = $1 LIMIT 1",
+            user_id
+        )
+        if record is None:
+            # created by a concurrent transaction that committed after this statement's snapshot
+            record = await self.pool_pg.fetchrow(f"SELECT * FROM {table} WHERE user_id = $1", user_id)
+        return record
+
     async def fetch_user_reminder_settings(self, user_id) -> ReminderConfig:
-        rem_db = await self.pool_pg.fetchrow("SELECT * FROM store_reminder WHERE user_id = $1", user_id)
-        if rem_db is None:
-            await self.pool_pg.execute("INSERT INTO store_reminder(user_id) VALUES ($1)", user_id)
-            rem_db = await self.pool_pg.fetchrow("SELECT * FROM store_reminder WHERE user_id = $1", user_id)
-        return ReminderConfig(rem_db)
-    
+        cached = reminder_config_cache.get(user_id)
+        if cached is None:
+            cached = ReminderConfig(await self._fetch_or_create("store_reminder", user_id))
+            reminder_config_cache.set(user_id, cached)
+        # callers mutate the config before saving it, never hand out the cached instance
+        return copy.copy(cached)
+
     async def fetch_user_settings(self, user_id) -> UserSetting:
-        usr_se_db = await self.pool_pg.fetchrow("SELECT * FROM user_settings WHERE user_id = $1", user_id)
-        if usr_se_db is None:
-            await self.pool_pg.execute("INSERT INTO user_settings(user_id) VALUES ($1)", user_id)
-            usr_se_db = await self.pool_pg.fetchrow("SELECT * FROM user_settings WHERE user_id = $1", user_id)
-        return UserSetting(usr_se_db)
+        cached = user_settings_cache.get(user_id)
+        if cached is None:
+            cached = UserSetting(await self._fetch_or_create("user_settings", user_id))
+            user_settings_cache.set(user_id, cached)
+        return copy.copy(cached)
     
     async def fetch_reminders(self) -> list[ReminderConfig]:
         reminders = await self.pool_pg.fetch("SELECT * FROM store_reminder")
         return [ReminderConfig(rem) for rem in reminders]
 
+    async def fetch_pending_reminders(self, reminder_date: datetime.date) -> list[ReminderConfig]:
+        """Enabled reminders that have not been delivered yet on ``reminder_date``."""
+        reminders = await self.pool_pg.fetch(
+            "SELECT r.* FROM store_reminder r WHERE r.enabled AND NOT EXISTS "
+            "(SELECT 1 FROM reminder_deliveries d WHERE d.user_id = r.user_id AND d.reminder_date = $1)",
+            reminder_date
+        )
+        return [ReminderConfig(rem) for rem in reminders]
+
+    async def record_reminder_deliveries(self, deliveries: list[tuple[int, datetime.date, str]]):
+        """Checkpoints ``(user_id, reminder_date, status)`` rows so an interrupted run doesn't send them again."""
+        await self.pool_pg.executemany(
+            "INSERT INTO reminder_deliveries(user_id, reminder_date, status) VALUES ($1, $2, $3) "
+            "ON CONFLICT(user_id, reminder_date) DO UPDATE SET status = $3",
+            deliveries
+        )
+
+    async def fetch_prefetch_accounts(self, store_date: datetime.date) -> list[RiotUser]:
+        """Riot accounts of users with reminders enabled whose store for ``store_date`` isn't cached yet."""
+        records = await self.pool_pg.fetch(
+            "SELECT v.* FROM valorant_login v JOIN store_reminder r ON r.user_id = v.user_id WHERE r.enabled AND NOT EXISTS "
+            "(SELECT 1 FROM cached_stores c WHERE c.username = v.username AND c.store_date = $1)",
+            store_date
+        )
+        return [RiotUser(record) for record in records]
+
+    async def insert_cached_stores(self, stores: list[tuple[int, str, datetime.date, str, str, str, str, int]]):
+        """
+        Bulk inserts ``(user_id, username, store_date, skin1, skin2, skin3, skin4, time_expire)`` rows, skipping
+        stores that were cached in the meantime.
+        """
+        await self.pool_pg.executemany(
+            "INSERT INTO cached_stores (user_id, username, store_date, skin1_uuid, skin2_uuid, skin3_uuid, skin4_uuid, time_expire) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7, $8) ON CONFLICT(username, store_date) DO NOTHING",
+            stores
+        )
+
+    async def start_reminder_run(self, run_date: datetime.date):
+        await self.pool_pg.execute("INSERT INTO reminder_runs(run_date) VALUES ($1) ON CONFLICT(run_date) DO NOTHING", run_date)
+
+    async def finish_reminder_run(self, run_date: datetime.date, sent: int, failed: int, finished: bool = True):
+        """Adds a run's counts, a run with undelivered reminders left is only marked as finished once they are sent."""
+        await self.pool_pg.execute(
+            "UPDATE reminder_runs SET finished_at = CASE WHEN $4 THEN now() ELSE finished_at END, "
+            "sent = sent + $2, failed = $3 WHERE run_date = $1",
+            run_date, sent, failed, finished
+        )
+
+    async def is_reminder_run_interrupted(self, run_date: datetime.date) -> bool:
+        """Whether a run was started on ``run_date`` and never finished."""
+        return await self.pool_pg.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM reminder_runs WHERE run_date = $1 AND finished_at IS NULL)", run_date
+        )
+
     async def insert_onetimestore(self, user_id, skin1, skin2, skin3, skin4):
         return await self.pool_pg.execute("INSERT INTO onetimestores (user_id, skin1_uuid, skin2_uuid, skin3_uuid, skin4_uuid) VALUES ($1, $2, $3, $4, $5)", user_id, skin1, skin2, skin3, skin4)
 
     async def get_store(self, disc_userid, username, headers, user_id, region, date: Optional[datetime.date] = None):
+        key = (username.lower(), date, headers is not None)
+        return await self._store_flights.do(key, self._get_store, disc_userid, username, headers, user_id, region, date)
+
+    async def _get_store(self, disc_userid, username, headers, user_id, region, date: Optional[datetime.date] = None):
         if date is not None:
             result = await self.pool_pg.fetchrow("SELECT * FROM cached_stores WHERE store_date = $1 AND username = $2", date, username)
             if result is None:
@@ -144,9 +407,9 @@ class DBManager:
             if result is None:
                 if headers is None or user_id is None or region is None:
                     return None, None
-                skin_uuids, remaining = await get_store.getStore(headers, user_id, region)
+                skin_uuids, remaining = await self.store_client.getStore(headers, user_id, region)
                 time_expire = int(time.time()) + remaining
-                await self.pool_pg.execute("INSERT INTO cached_stores (user_id, username, store_date, skin1_uuid, skin2_uuid, skin3_uuid, skin4_uuid, time_expire) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)", disc_userid, username, discord.utils.utcnow().date(), skin_uuids[0], skin_uuids[1], skin_uuids[2], skin_uuids[3], time_expire)
+                await self.pool_pg.execute("INSERT INTO cached_stores (user_id, username, store_date, skin1_uuid, skin2_uuid, skin3_uuid, skin4_uuid, time_expire) VALUES ($1, $2, $3, $4, $5, $6, $7, $8) ON CONFLICT(username, store_date) DO NOTHING", disc_userid, username, discord.utils.utcnow().date(), skin_uuids[0], skin_uuids[1], skin_uuids[2], skin_uuids[3], time_expire)
             else:
                 skin_uuids = [result.get("skin1_uuid"), result.get("skin2_uuid"), result.get("skin3_uuid"), result.get("skin4_uuid")]
                 remaining = result.get('time_expire') - int(time.time())
@@ -168,6 +431,17 @@ class DBManager:
 
         return [Accessory.from_record(acc_r) for acc_r in accessories_raw]
 
+    async def load_accessory_index(self) -> SearchIndex:
+        accessories_raw = await self.pool_pg.fetch("SELECT name, type FROM accessories")
+        index = SearchIndex((acc.get("name"), acc.get("type")) for acc in accessories_raw)
+        DBManager.accessory_search = index
+        return index
+
+    async def search_accessories(self, query: str, accessory_type: Optional[AccessoryType] = None, limit: int = 25) -> list[str]:
+        if self.accessory_search is None:
+            await self.load_accessory_index()
+        return self.accessory_search.search(query, limit, accessory_type.value if accessory_type is not None else None)
+
     async def get_accessory_by_name_or_uuid(self, query):
         q = "SELECT * FROM accessories WHERE name = $1 OR uuid = $1"
 
@@ -1,125 +1,78 @@
-import json
 import time
 from io import BytesIO
+from typing import Optional
 
-import aiohttp
 import discord
 from discord.ext import commands
 
 from main import clvt
 from utils import riot_authorization, get_store, checks
+from utils.assets import assets
 from utils.errors import WeAreStillDisabled
 from utils.helper import get_region_code
-from utils.specialobjects import GunSkin, PlayerCard, PlayerTitle, Spray, Buddy
+from utils.specialobjects import GunSkin, PlayerCard, PlayerTitle, Spray, Buddy, AccessoryType
 from utils.time import humanize_timedelta
 from .account_management import AccountManagement
 from .database import DBManager
 from utils.responses import *
 from utils.buttons import confirm, SingleURLButton, ThumbnailToImageOnly, ThumbnailAndWishlist, ThumbWishViewVariants, \
     NightMarketView, EnterMultiFactor
-import os
-from dotenv import load_dotenv
 
 from .update_skin_db import UpdateSkinDB
 from .wishlist import WishListManager
-from .reminders import StoreReminder, ViewStoreFromReminder
-
-load_dotenv()
+from .reminders import StoreReminder, StorePrefetcher, ViewStoreFromReminder
 
 
 class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkinDB, commands.Cog):
     def __init__(self, client):
         self.client: clvt = client
         self.dbManager: DBManager = DBManager(self.client.db)
+        self.store_prefetcher: Optional[StorePrefetcher] = None
         self.ready = False
 
     @commands.Cog.listener()
     async def on_ready(self):
         await self.client.wait_until_ready()
-        self.dbManager = DBManager(self.client.db)
+        self.dbManager = DBManager(self.client.db, self.client.store_client)
+        await self.dbManager.load_skin_catalog()
+        await self.dbManager.load_accessory_index()
+        await self.dbManager.load_themes()
         self.ready = True
-        self.reminder_loop.start()
-        self.update_skin_db.start()
+        scheduler = self.client.scheduler
+        # the catalog refresh is spread over a window so it doesn't always land next to the reminders
+        scheduler.register("daily_reminder", self.reminder_loop)
+        scheduler.register("catalog_refresh", self.update_skin_db, jitter=1800)
+        await scheduler.start(self.client.db)
+        await self.schedule_reminders()
+        await scheduler.ensure("catalog_refresh:all", discord.utils.utcnow())
         self.client.add_view(ThumbnailAndWishlist(self.dbManager))
         self.client.add_view(ThumbWishViewVariants(self.dbManager))
         self.client.add_view(ThumbnailToImageOnly())
         self.client.add_view(ViewStoreFromReminder(self.dbManager, self))
 
-    async def fetch_currency_api(self):
-        key = os.getenv("CURRENCY_API")
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "apikey": key
-            }
-            async with session.get("https://api.freecurrencyapi.com/v1/latest", headers=headers) as resp:
-                if resp.status == 200:
-                    return (await resp.json())["data"]
-
-    async def get_currencies(self):
-        currency = await self.client.redis_pool.get("currency")
-        if currency is None:
-            currency = await self.fetch_currency_api()
-            await self.client.redis_pool.set("currency", json.dumps(currency))
-            await self.client.redis_pool.expire("currency", 86400)
-        else:
-            currency = json.loads(currency)
-        return currency
-
-    async def get_currency(self, currency_code: str):
-        currency = await self.get_currencies()
-        if currency_code.upper() in currency:
-            return currency[currency_code.upper()]
-        else:
-            return None
-
     async def get_currency_details(self, currency_code: str):
         if currency_code is None:
             return None
-        with open("assets/currencies.json") as f:
-            currencies = json.load(f)
-        a = currencies["data"].get(currency_code.upper(), None)
-        if a is not None and a["vp_per_dollar"] == 0:
-            a["exch"] = await self.get_currency(a["code"])
-        return a
+        # serves the last known rates, the price table picks up fresh ones when the refresh completes
+        self.client.exchange_rates.get()
+        return assets.currency(currency_code)
 
     async def valorant_skin_autocomplete(self, ctx: discord.AutocompleteContext):
         if not self.ready:
             return ["Cypher's Laptop is still booting up. Try again in a few seconds!"]
-        sk = await self.dbManager.get_all_skins()
-
-        if len(ctx.value) > 0:
-            results = []
-            for skin in sk:
-                if ctx.value.lower() in skin.displayName.lower():
-                    results.append(skin.displayName)
-            return results[:25]
-        else:
-            return [s.displayName for s in sk[:25]]
+        return await self.dbManager.search_skins(ctx.value)
 
     async def valorant_accessory_autocomplete(self, ctx: discord.AutocompleteContext):
         if not self.ready:
             return ["Cypher's Laptop is still booting up. Try again in a few seconds!"]
-        ac = await self.dbManager.get_all_accessories()
-        selected_type = ctx.options.get("type")
-        print(selected_type)
-        if selected_type == "Player Card":
-            ac = [a for a in ac if isinstance(a, PlayerCard)]
-        elif selected_type == "Player Title":
-            ac = [a for a in ac if isinstance(a, PlayerTitle)]
-        elif selected_type == "Spray":
-            ac = [a for a in ac if isinstance(a, Spray)]
-        elif selected_type == "Gun Buddy":
-            ac = [a for a in ac if isinstance(a, Buddy)]
-        else:
-            print("No type filter")
-        if len(ctx.value) > 0:
-            results = []
-            for a in ac:
-                if ctx.value.lower() in a.name.lower():
-                    results.append(a.name)
-            return results[:25]
-        else:
-            return [a.name for a in ac[:25]]
+        accessory_types = {
+            "Player Card": AccessoryType.PLAYER_CARD,
+            "Player Title": AccessoryType.PLAYER_TITLE,
+            "Spray": AccessoryType.SPRAY,
+            "Gun Buddy": AccessoryType.BUDDY
+        }
+        selected_type = accessory_types.get(ctx.options.get("type"))
+        return await self.dbManager.search_accessories(ctx.value, selected_type)
 
     skin_option = discord.Option(str, description="Skin name", autocomplete=valorant_skin_autocomplete)
 
@@ -138,8 +91,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
         else:
             return await ctx.respond(embed=no_logged_in_account(), ephemeral=True)
         try:
-            auth = riot_authorization.RiotAuth()
-            await auth.authorize(riot_account.username, riot_account.password)
+            auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password)
         except riot_authorization.Exceptions.RiotAuthenticationError:
             await ctx.respond(embed=authentication_error())
             print("Authentication error")
@@ -156,8 +108,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             if v.code is None:
                 return
             try:
-                auth = riot_authorization.RiotAuth()
-                await auth.authorize(riot_account.username, riot_account.password, multifactor_code=v.code)
+                auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password, multifactor_code=v.code)
             except riot_authorization.Exceptions.RiotAuthenticationError:
                 await v.modal.interaction.edit_original_response(embed=authentication_error(), delete_after=30.0)
                 print("Authentication error")
@@ -178,7 +129,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             "X-Riot-ClientPlatform": "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9",
             "X-Riot-ClientVersion": "release-08.09-shipping-57-2521387"
         }
-        vp, rp, kc, fa = await get_store.getBalance(headers, auth.user_id, riot_account.region)
+        vp, rp, kc, fa = await self.client.store_client.getBalance(headers, auth.user_id, riot_account.region)
         user_settings = await self.dbManager.fetch_user_settings(ctx.author.id)
         usrn = riot_account.username if user_settings.show_username else ctx.author.name
         embed = discord.Embed(title=f"{usrn}'s Balance", color=discord.Color.blurple())
@@ -203,8 +154,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
         else:
             return await ctx.respond(embed=no_logged_in_account(), ephemeral=True)
         try:
-            auth = riot_authorization.RiotAuth()
-            await auth.authorize(riot_account.username, riot_account.password)
+            auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password)
         except riot_authorization.Exceptions.RiotAuthenticationError:
             await ctx.respond(embed=authentication_error())
             print("Authentication error")
@@ -222,8 +172,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             if v.code is None:
                 return
             try:
-                auth = riot_authorization.RiotAuth()
-                await auth.authorize(riot_account.username, riot_account.password, multifactor_code=v.code)
+                auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password, multifactor_code=v.code)
             except riot_authorization.Exceptions.RiotAuthenticationError:
                 b.label = "Authentication failed"
                 b.emoji = discord.PartialEmoji.from_str("<:CL_False:1075296226620223499>")
@@ -256,7 +205,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             "X-Riot-ClientPlatform": "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9",
             "X-Riot-ClientVersion": "release-08.09-shipping-57-2521387"
         }
-        skins, remaining = await get_store.getNightMarket(headers, auth.user_id, riot_account.region)
+        skins, remaining = await self.client.store_client.getNightMarket(headers, auth.user_id, riot_account.region)
         if skins is None:
             if time.time() < 1680652800:
                 embed = night_market_closed(True)
@@ -316,17 +265,19 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             f"{ctx.author} ({ctx.author.id}) tried to run store command")
         if ctx.author.id != 650647680837484556 and limited is True:
             raise WeAreStillDisabled()
-        riot_account = await self.dbManager.get_user_by_user_id(ctx.author.id)
+        user_context = await self.dbManager.get_user_context(ctx.interaction)
+        riot_account = user_context.account
         if riot_account:
             await ctx.defer()
         else:
             return await ctx.respond(embed=no_logged_in_account(), ephemeral=True)
         # attempt to fetch store from cache first, if no record exists we'll run it again
-        skin_uuids, remaining = await self.dbManager.get_store(ctx.author.id, riot_account.username, None, None, None)
-        if skin_uuids is None:
+        skin_uuids = user_context.cached_store
+        if skin_uuids is not None:
+            remaining = user_context.cached_store_expire - int(time.time())
+        else:
             try:
-                auth = riot_authorization.RiotAuth()
-                await auth.authorize(riot_account.username, riot_account.password)
+                auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password)
             except riot_authorization.Exceptions.RiotAuthenticationError:
                 await ctx.respond(embed=authentication_error())
                 print("Authentication error")
@@ -344,8 +295,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
                 if v.code is None:
                     return
                 try:
-                    auth = riot_authorization.RiotAuth()
-                    await auth.authorize(riot_account.username, riot_account.password, multifactor_code=v.code)
+                    auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password, multifactor_code=v.code)
                 except riot_authorization.Exceptions.RiotAuthenticationError:
                     b.label = "Authentication failed"
                     b.emoji = discord.PartialEmoji.from_str("<:CL_False:1075296226620223499>")
@@ -383,16 +333,15 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             except KeyError:
                 error_embed = discord.Embed(title="Cypher's Laptop was unable to fetch your store.", description="Cypher's Laptop contacted the Riot Games API, and Riot Games responded but did not provide any information about your store. this might be due to an [ongoing login issue](https://status.riotgames.com/valorant?regionap&locale=en_US).\n\nNontheless, this is a known issue and the developer is monitoring it. Try again in a few minutes to check your store!", embed=discord.Color.red())
                 return await ctx.respond(embed=error_embed)
-        onetimestore = await self.client.db.fetchrow("SELECT skin1_uuid, skin2_uuid, skin3_uuid, skin4_uuid FROM onetimestores WHERE user_id = $1", ctx.author.id)
-        if onetimestore:
-            skin_uuids = [onetimestore.get('skin1_uuid'), onetimestore.get('skin2_uuid'), onetimestore.get('skin3_uuid'), onetimestore.get('skin4_uuid')]
+        if user_context.onetimestore:
+            skin_uuids = user_context.onetimestore
             await self.client.db.execute("DELETE FROM onetimestores WHERE user_id = $1", ctx.author.id)
-        user_settings = await self.dbManager.fetch_user_settings(ctx.author.id)
+        user_settings = user_context.settings or await self.dbManager.fetch_user_settings(ctx.author.id)
         usrn = riot_account.username if user_settings.show_username else ctx.author.name
         embeds = [discord.Embed(title=f"{usrn}'s <:val:1046289333344288808> VALORANT Store ",
                                 description=f"Resets <t:{int(time.time()) + remaining}:R>", color=self.client.embed_color)]
         currency = await self.get_currency_details(user_settings.currency)
-        wishlisted_skins = await self.dbManager.get_user_wishlist(ctx.author.id)
+        wishlisted_skins = set(user_context.wishlist).intersection(skin_uuids)
         wishlisted = 0
         for uuid in skin_uuids:
             sk = await self.dbManager.get_skin_by_uuid(uuid)
@@ -417,13 +366,14 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
         if not self.ready:
             return await ctx.respond(embed=not_ready())
         skin = await self.dbManager.get_skin_by_name_or_uuid(name)
-        wishlist = await self.dbManager.get_user_wishlist(ctx.author.id)
+        user_context = await self.dbManager.get_user_context(ctx.interaction)
+        wishlist = user_context.wishlist
         if skin:
             view = ThumbWishViewVariants(self.dbManager, skin, skin.uuid in wishlist)
-            user_settings = await self.dbManager.fetch_user_settings(ctx.author.id)
+            user_settings = user_context.settings or await self.dbManager.fetch_user_settings(ctx.author.id)
             currency = await self.get_currency_details(user_settings.currency)
             e = skin_embed(skin, skin.uuid in wishlist, currency)
-            if await self.client.is_dev(ctx.author.id):
+            if user_context.is_dev:
                 c = f"`{skin.uuid}`"
             else:
                 c = None
@@ -442,7 +392,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
         if accessory:
             #user_settings = await self.dbManager.fetch_user_settings(ctx.author.id)
             #currency = await self.get_currency_details(user_settings.currency)
-            e = await accessory_embed(accessory)
+            e = accessory_embed(accessory, self.dbManager.get_theme_name(accessory.theme_uuid))
             if await self.client.is_dev(ctx.author.id):
                 c = f"`{accessory.uuid}`"
             else:
@@ -455,7 +405,8 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
     @commands.slash_command(name="update_skins_database",
                             description="Manually update the internal VALORANT gun skins database.", guild_ids=[801457328346890241])
     @discord.default_permissions(administrator=True)
-    async def update_skins_database(self, ctx: discord.ApplicationContext):
+    async def update_skins_database(self, ctx: discord.ApplicationContext,
+                                    force: discord.Option(bool, description="Ignore the cached validators and ingest every source again") = False):
         riot_account = await self.dbManager.get_user_by_user_id(0)
         if riot_account:
             await ctx.defer(ephemeral=True)
@@ -464,7 +415,7 @@ class MainCommands(AccountManagement, StoreReminder, WishListManager, UpdateSkin
             e.description = "In the database, add a Riot account with the user ID 0 to use this command. This " \
                             "account will be used to fetch data from the Riot API without using your own account. "
             return await ctx.respond(embed=e, ephemeral=True)
-        await self.update_skin_db()
+        await self.update_skin_db({"force": force})
         await ctx.respond(embed=updated_weapon_database())
 
     @discord.default_permissions(administrator=True)
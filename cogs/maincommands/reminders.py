@@ -1,16 +1,19 @@
+import asyncio
 import copy
 import time
-from datetime import timedelta, datetime
+from io import BytesIO
+from typing import Optional
+from datetime import timedelta, datetime, date, timezone
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 
 from cogs.maincommands.database import DBManager
 from main import clvt
 from utils.buttons import ThumbnailToImageOnly, EnterMultiFactor
 from utils.errors import WeAreStillDisabled
-from utils.format import box
+from utils.format import box, print_exception
 from utils.responses import *
 from utils.specialobjects import *
 from utils import get_store, riot_authorization
@@ -37,8 +40,7 @@ class ViewStoreFromDaily(discord.ui.Button):
                 return await cl_unavailable_riot_sucks(interaction)
                 await interaction.response.defer(ephemeral=True, invisible=False)
                 try:
-                    auth = riot_authorization.RiotAuth()
-                    await auth.authorize(riot_account.username, riot_account.password)
+                    auth = await interaction.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password)
                 except riot_authorization.Exceptions.RiotAuthenticationError:
                     await interaction.followup.send(embed=authentication_error())
                     print("Authentication error")
@@ -56,8 +58,7 @@ class ViewStoreFromDaily(discord.ui.Button):
                     if v.code is None:
                         return
                     try:
-                        auth = riot_authorization.RiotAuth()
-                        await auth.authorize(riot_account.username, riot_account.password, multifactor_code=v.code)
+                        auth = await interaction.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password, multifactor_code=v.code)
                     except riot_authorization.Exceptions.RiotAuthenticationError:
                         b.label = "Authentication failed"
                         b.emoji = discord.PartialEmoji.from_str("<:CL_False:1075296226620223499>")
@@ -104,7 +105,7 @@ class ViewStoreFromDaily(discord.ui.Button):
                     return method(embed=error_embed)
                 print("Store fetch successful")
         wishlisted = 0
-        wishlist = await self.DBManager.get_user_wishlist(interaction.user.id)
+        wishlist = await self.DBManager.get_wishlisted_skins(interaction.user.id, skins, message_date)
         user_settings = await self.DBManager.fetch_user_settings(interaction.user.id)
         embed_description = date_asstr if message_date != discord.utils.utcnow().date() else f"Resets <t:{int(time.time()) + remaining}:R>"
         if riot_account:
@@ -117,8 +118,10 @@ class ViewStoreFromDaily(discord.ui.Button):
         base_embed = discord.Embed(title=f"{username} <:val:1046289333344288808> VALORANT Store", description=embed_description, color=interaction.client.embed_color)
         embeds = [base_embed]
         currency = await self.cog.get_currency_details(user_settings.currency)
+        store_skins = []
         for skin in skins:
             sk: GunSkin = await self.DBManager.get_skin_by_uuid(skin)
+            store_skins.append(sk)
             if sk.uuid in wishlist:
                 wishlisted += 1
                 is_wishlist = True
@@ -127,6 +130,18 @@ class ViewStoreFromDaily(discord.ui.Button):
             embeds.append(skin_embed(sk, is_wishlist, currency))
         if wishlisted > 0:
             embeds[0].set_footer(text=f"You have {wishlisted} skins wishlisted in this store!", icon_url="https://cdn.discordapp.com/emojis/1046281227142975538.webp?size=96")
+        reminder_config = await self.DBManager.fetch_user_reminder_settings(interaction.user.id)
+        if reminder_config.picture_mode:
+            if not interaction.response.is_done():
+                await interaction.response.defer(ephemeral=True, invisible=False)
+            try:
+                image = await interaction.client.store_renderer.render(store_skins, user_settings.currency, wishlist)
+            except Exception as e:
+                # falls back to the embeds below
+                print_exception("Could not render store picture, ", e)
+            else:
+                base_embed.set_image(url="attachment://store.png")
+                return await interaction.followup.send(embed=base_embed, file=discord.File(BytesIO(image), "store.png"), ephemeral=True)
         if interaction.response.is_done():
             method = interaction.followup.send
         else:
@@ -221,10 +236,207 @@ class ReminderSettingsView(discord.ui.View):
         self.embed.color = discord.Color.green() if getattr(self.reminder_config, self.current_selected) else discord.Color.red()
 
 
+class StorePrefetcher:
+    """
+    Fetches today's store for every account with reminders enabled right after the daily reset.
+
+    Accounts are processed by a pool of workers, with a separate concurrency limit for each region's pd shard,
+    and the stores are written to ``cached_stores`` in batches, so clicking "View Store" on a reminder is usually
+    a cache read instead of an authorization and store fetch. Reminders don't wait for the whole prefetch, a
+    store that isn't cached yet is fetched when its button is clicked.
+    """
+
+    def __init__(self, client: clvt, dbManager: DBManager, workers: int = 16, per_region: int = 4, batch_size: int = 50):
+        self.client = client
+        self.dbManager = dbManager
+        self.workers = workers
+        self.per_region = per_region
+        self.batch_size = batch_size
+        self.total = 0
+        self.fetched = 0
+        self.failed = 0
+        self.next_reset: Optional[int] = None
+        self._region_limits: dict[str, asyncio.Semaphore] = {}
+        self._pending: list[tuple] = []
+
+    @property
+    def progress(self) -> float:
+        return (self.fetched + self.failed) / self.total if self.total else 1.0
+
+    async def _flush(self):
+        if len(self._pending) > 0:
+            stores, self._pending = self._pending, []
+            try:
+                await self.dbManager.insert_cached_stores(stores)
+            except Exception as e:
+                # fetched but never cached, the reminders' buttons fetch these stores again
+                self.fetched -= len(stores)
+                self.failed += len(stores)
+                print_exception(f"Could not cache {len(stores)} prefetched stores, ", e)
+            print(f"Prefetching stores: {self.fetched + self.failed}/{self.total} ({self.progress:.0%}), {self.failed} failed")
+
+    async def _prefetch(self, riot_account: RiotUser, store_date):
+        limit = self._region_limits.setdefault(riot_account.region, asyncio.Semaphore(self.per_region))
+        async with limit:
+            # accounts with multifactor or a changed password can't be fetched unattended
+            auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password)
+            headers = {
+                "Authorization": f"Bearer {auth.access_token}",
+                "User-Agent": riot_account.username,
+                "X-Riot-Entitlements-JWT": auth.entitlements_token,
+                "X-Riot-ClientPlatform": "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9",
+                "X-Riot-ClientVersion": self.client.riot_auth_transport.client_version
+            }
+            skin_uuids, remaining = await self.client.store_client.getStore(headers, auth.user_id, riot_account.region)
+        time_expire = int(time.time()) + remaining
+        # every store resets at the same instant, the storefront tells us exactly when
+        self.next_reset = min(self.next_reset or time_expire, time_expire)
+        self._pending.append((riot_account.user_id, riot_account.username, store_date, *skin_uuids[:4], time_expire))
+
+    async def _worker(self, queue: asyncio.Queue, store_date):
+        while True:
+            try:
+                riot_account = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._prefetch(riot_account, store_date)
+            except Exception:
+                self.failed += 1
+            else:
+                self.fetched += 1
+            # flushed once the batch is counted as fetched, a failed insert moves all of it to failed
+            if len(self._pending) >= self.batch_size:
+                await self._flush()
+
+    async def run(self, store_date) -> str:
+        """Prefetches every uncached store for ``store_date`` and returns a summary for the status webhook."""
+        started = time.perf_counter()
+        accounts = await self.dbManager.fetch_prefetch_accounts(store_date)
+        self.total = len(accounts)
+        queue = asyncio.Queue()
+        for riot_account in accounts:
+            queue.put_nowait(riot_account)
+        try:
+            await asyncio.gather(*[self._worker(queue, store_date) for _ in range(min(self.workers, len(accounts)))])
+        finally:
+            await self._flush()
+        return f"Prefetched {self.fetched} of {self.total} stores ({self.failed} failed, {self.progress:.0%} done) in {time.perf_counter() - started:.1f}s"
+
+
+class ReminderDispatcher:
+    """
+    Sends the daily store reminders with a bounded number of concurrent DMs.
+
+    Users are resolved from the cache before falling back to the API, and every delivery is checkpointed in
+    ``reminder_deliveries`` so a restart in the middle of a run resumes with the users that were not reached yet.
+    Deliveries that fail with an unexpected error are retried with a growing delay, the run is only marked as
+    finished once none of them are left.
+    """
+
+    def __init__(self, client: clvt, dbManager: DBManager, view: discord.ui.View, concurrency: int = 8, checkpoint_every: int = 25,
+                 retries: int = 3, retry_delay: float = 30.0):
+        self.client = client
+        self.dbManager = dbManager
+        self.view = view
+        # opening a DM channel shares one route across all users, so a handful of workers saturates it
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.skipped = 0
+        self.errors: list[tuple[int, Exception]] = []
+        self._failed: list[ReminderConfig] = []
+        self._checkpoint: list[tuple[int, date, str]] = []
+
+    async def _get_dm_channel(self, user_id: int) -> discord.DMChannel:
+        user = self.client.get_user(user_id)
+        if user is not None and user.dm_channel is not None:
+            return user.dm_channel
+        return await self.client.create_dm(user or discord.Object(id=user_id))
+
+    async def _flush(self):
+        if len(self._checkpoint) > 0:
+            deliveries, self._checkpoint = self._checkpoint, []
+            await self.dbManager.record_reminder_deliveries(deliveries)
+
+    async def _deliver(self, reminder: ReminderConfig, reminder_date):
+        matches = self.dbManager.wishlist_matches
+        has_wishlisted = matches is not None and matches.store_date == reminder_date and len(matches.for_user(reminder.user_id)) > 0
+        notif_embed, actual_embed = store_here(has_wishlisted)
+        try:
+            channel = await self._get_dm_channel(reminder.user_id)
+            await channel.send(embed=actual_embed, view=self.view)
+        except discord.NotFound:
+            self.skipped += 1
+            status = "not_found"
+        except discord.Forbidden:
+            self.skipped += 1
+            status = "forbidden"
+            reminder.enabled = False
+            await reminder.update(self.client)
+        except Exception as e:
+            # not checkpointed, retried later in this run and by a resumed run if it still fails
+            self.errors.append((reminder.user_id, e))
+            self._failed.append(reminder)
+            return
+        else:
+            self.sent += 1
+            status = "sent"
+        self._checkpoint.append((reminder.user_id, reminder_date, status))
+        if len(self._checkpoint) >= self.checkpoint_every:
+            await self._flush()
+
+    async def _worker(self, queue: asyncio.Queue, reminder_date):
+        while True:
+            try:
+                reminder = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._deliver(reminder, reminder_date)
+
+    @property
+    def finished(self) -> bool:
+        return len(self._failed) == 0
+
+    async def _deliver_all(self, reminders: list[ReminderConfig], reminder_date):
+        queue = asyncio.Queue()
+        for reminder in reminders:
+            queue.put_nowait(reminder)
+        try:
+            await asyncio.gather(*[self._worker(queue, reminder_date) for _ in range(min(self.concurrency, len(reminders)))])
+        finally:
+            await self._flush()
+
+    async def run(self, reminder_date) -> str:
+        """Delivers every pending reminder for ``reminder_date`` and returns a summary for the status webhook."""
+        started = time.perf_counter()
+        await self.dbManager.start_reminder_run(reminder_date)
+        reminders = await self.dbManager.fetch_pending_reminders(reminder_date)
+        await self._deliver_all(reminders, reminder_date)
+        retried = 0
+        while not self.finished and retried < self.retries:
+            await asyncio.sleep(self.retry_delay * 2 ** retried)
+            retried += 1
+            # only the errors of the last attempt are reported
+            failed, self._failed, self.errors = self._failed, [], []
+            await self._deliver_all(failed, reminder_date)
+        await self.dbManager.finish_reminder_run(reminder_date, self.sent, len(self.errors), self.finished)
+        elapsed = time.perf_counter() - started
+        return f"{self.sent} sent, {self.skipped} skipped, {len(self.errors)} failed of {len(reminders)} pending " \
+               f"after {retried} retries\n" \
+               f"{'Finished' if self.finished else 'Unfinished, will resume'} in {elapsed:.1f}s ({self.sent / elapsed if elapsed else 0:.1f}/s)"
+
+
 class StoreReminder(commands.Cog):
+    # how long reminders wait for the prefetch before they are sent anyway
+    PREFETCH_WINDOW = 60.0
+
     def __init__(self, client):
         self.client: clvt = client
         self.dbManager: DBManager = DBManager(self.client.db)
+        self.store_prefetcher: Optional[StorePrefetcher] = None
 
     @commands.slash_command(name="reminders", description="Configure your VALORANT Store reminders")
     async def reminder_cmd(self, ctx):
@@ -234,44 +446,48 @@ class StoreReminder(commands.Cog):
         await ctx.respond(embed=enable_disable_embed, view=view)
         await view.wait()
 
-    @tasks.loop(hours=24)
-    async def reminder_loop(self):
-        todays_date = discord.utils.utcnow().date()
-        reminders = await self.dbManager.fetch_reminders()
-        limited = await get_store.check_limited_function(self.client)
-        if limited is True:
-            return
-        for reminder in reminders:
-            try:
-                if not reminder.enabled:
-                    continue
-                try:
-                    user = await self.client.fetch_user(reminder.user_id)
-                except discord.NotFound:
-                    continue
-                notif_embed, actual_embed = store_here(False)
-                # if reminder.show_immediately is not True: # show a button in the message, disabled for now as it is irrelevant
-                try:
-                    m = await user.send(embed=notif_embed, view=ViewStoreFromReminder(self.dbManager, self))
-                    await m.edit(embed=actual_embed)
-                except discord.Forbidden:
-                    reminder.enabled = False
-                    await reminder.update(self.client)
-                except Exception as e:
-                    print(e)
-            except Exception as e:
-                await self.client.error_channel.send(f"Error while processing store for {reminder.user_id}:\n{box(str(e), lang='py')}")
-        await self.client.update_service_status("Daily Store Reminder", round(time.time()))
+    def next_store_reset(self) -> datetime:
+        """The next daily store reset, as reported by the last prefetched storefront when available."""
+        now = discord.utils.utcnow()
+        if self.store_prefetcher is not None and self.store_prefetcher.next_reset is not None:
+            reset = datetime.fromtimestamp(self.store_prefetcher.next_reset, tz=timezone.utc)
+            if reset > now:
+                return reset
+        return now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
 
-    @reminder_loop.before_loop
-    async def wait_until_reset(self):
-        await self.client.wait_until_ready()
+    async def schedule_reminders(self):
         todays_date = discord.utils.utcnow().date()
-        a = await self.client.db.fetch("SELECT * FROM cached_stores WHERE store_date = $1", todays_date)
-        if len(a) < 1:
-            # somehow no one's store was fetched, so we won't wait until 8am the next day.
-            pass
+        if await self.dbManager.is_reminder_run_interrupted(todays_date):
+            # today's run started and was interrupted, resume it now; delivered reminders are skipped
+            await self.client.scheduler.schedule("daily_reminder:all", discord.utils.utcnow(), jitter=False)
         else:
-            now = discord.utils.utcnow()
-            next_run = now.replace(hour=0, minute=1, second=0) + timedelta(days=1)
-            await discord.utils.sleep_until(next_run)
+            await self.client.scheduler.ensure("daily_reminder:all", self.next_store_reset() + timedelta(minutes=1))
+
+    async def reminder_loop(self, payload=None) -> datetime:
+        todays_date = discord.utils.utcnow().date()
+        limited = await get_store.check_limited_function(self.client)
+        if limited is True:
+            return self.next_store_reset() + timedelta(minutes=1)
+        error = None
+        details = None
+        self.store_prefetcher = StorePrefetcher(self.client, self.dbManager)
+        dispatcher = ReminderDispatcher(self.client, self.dbManager, ViewStoreFromReminder(self.dbManager, self))
+        prefetch = asyncio.create_task(self.store_prefetcher.run(todays_date))
+        try:
+            # the prefetch gets a head start to fill cached_stores, then keeps going while the reminders are sent
+            await asyncio.wait({prefetch}, timeout=self.PREFETCH_WINDOW)
+            await self.dbManager.load_wishlist_matches(todays_date)
+            dispatched = await dispatcher.run(todays_date)
+            details = f"{await prefetch}\n{dispatched}"
+        except Exception as e:
+            prefetch.cancel()
+            error = str(e)
+            print_exception("Ignoring exception while sending store reminders, ", e)
+        if len(dispatcher.errors) > 0:
+            lines = "\n".join(f"{user_id}: {e}" for user_id, e in dispatcher.errors[:20])
+            await self.client.error_channel.send(f"{len(dispatcher.errors)} store reminders failed:\n{box(lines, lang='py')}")
+        await self.client.update_service_status("Daily Store Reminder", round(time.time()), error, details)
+        if error is None and not dispatcher.finished:
+            # resume the run for the reminders that are still failing rather than waiting for tomorrow's
+            return discord.utils.utcnow() + timedelta(minutes=15)
+        return self.next_store_reset() + timedelta(minutes=1)
@@ -1,10 +1,11 @@
+import asyncio
+import datetime
 import json
 import re
 import time
 
-import aiohttp
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from cogs.maincommands.database import DBManager
 from main import clvt
@@ -12,6 +13,21 @@ from utils import riot_authorization, get_store
 from utils.format import print_exception
 from utils.specialobjects import GunSkin
 
+SKINS_URL = "https://valorant-api.com/v1/weapons/skins"
+ACCESSORY_URLS = {
+    "playercard": "https://valorant-api.com/v1/playercards",
+    "buddy": "https://valorant-api.com/v1/buddies",
+    "spray": "https://valorant-api.com/v1/sprays",
+    "playertitle": "https://valorant-api.com/v1/playertitles",
+}
+THEMES_URL = "https://valorant-api.com/v1/themes"
+SOURCE_NAMES = {
+    ACCESSORY_URLS["playercard"]: "player cards",
+    ACCESSORY_URLS["buddy"]: "buddies",
+    ACCESSORY_URLS["spray"]: "sprays",
+    ACCESSORY_URLS["playertitle"]: "player titles",
+    THEMES_URL: "themes",
+}
 
 
 class UpdateSkinDB(commands.Cog):
@@ -20,210 +36,262 @@ class UpdateSkinDB(commands.Cog):
         self.dbManager: DBManager = DBManager(self.client.db)
 
 
-    @tasks.loop(hours=18)
-    async def update_skin_db(self):
+    async def update_skin_db(self, payload=None) -> datetime.datetime:
+        next_run = discord.utils.utcnow() + datetime.timedelta(hours=18)
+        # a forced refresh skips the stored validators and ingests every source again
+        force = bool(payload and payload.get("force"))
         upd_time = int(time.time())
         error = None
+        details = None
         limited = await get_store.check_limited_function(self.client)
         if limited is True:
-            return
+            return next_run
         try:
-            riot_account = await self.dbManager.get_user_by_user_id(0)
-            if riot_account:
-                pass
+            client_version = self.client.riot_auth_transport.client_version
+            source = (await self.dbManager.get_catalog_sources()).get(SKINS_URL)
+            if not force and source is not None and source.get("client_version") == client_version:
+                skins_etag, skins_last_modified = source.get("etag"), source.get("last_modified")
             else:
-                error = "No Riot Account with user ID 0"
-            try:
-                auth = riot_authorization.RiotAuth()
-                await auth.authorize(riot_account.username, riot_account.password)
-            except riot_authorization.Exceptions.RiotAuthenticationError:
-                error = "Riot Authentication Error"
-            except riot_authorization.Exceptions.RiotRatelimitError:
-                error = "Riot Ratelimit Error"
-            except riot_authorization.Exceptions.RiotMultifactorError:
-                error = "Riot Multifactor Error"
+                # a new patch can change offer prices even when valorant-api.com serves the same skins
+                skins_etag = skins_last_modified = None
+            started = time.perf_counter()
+            status, raw_skins, skins_etag, skins_last_modified = await self.client.store_client.getConditional(SKINS_URL, skins_etag, skins_last_modified)
+            if status == 304:
+                details = f"Not modified since the last refresh ({client_version})"
+            elif raw_skins is None:
+                error = f"valorant-api.com responded with {status}"
             else:
-                headers = {
-                    "Authorization": f"Bearer {auth.access_token}",
-                    "User-Agent": riot_account.username,
-                    "X-Riot-Entitlements-JWT": auth.entitlements_token,
-                    "X-Riot-ClientPlatform": "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9",
-                    "X-Riot-ClientVersion": "release-07.01-shipping-28-925799"
-                }
-                raw_offers = await get_store.getRawOffers(headers, riot_account.region)
-                all_skins = await get_store.getAllSkins()
-                skins = []
-                for s in all_skins:
-                    i = GunSkin()
-                    i.contentTierUUID = s["contentTierUuid"]
-                    if i.contentTierUUID is None:
-                        continue
-                    skin = s["levels"]
-                    for b in skin:
-                        i.displayName = b["displayName"]
-                        i.uuid = b["uuid"].lower()
-                        i.displayIcon = b["displayIcon"]
-                        for offer in raw_offers:
-                            if offer["OfferID"].lower() == b["uuid"].lower():
-                                i.cost = offer["Cost"]["85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741"]
-                                break
-                        break
-                    raw_levels = s["levels"]
-                    raw_chromas = s["chromas"]
-                    chromas = []
-                    levels = []
-
-                    def get_level(s):
-                        # Find the substring "Level" and the number following it
-                        match = re.search(r'Level (\d+)', s)
-                        if match:
-                            # Return the number as an integer
-                            return int(match.group(1))
-                        else:
-                            # Return None if no match was found
-                            return None
-
-                    for c in raw_chromas:
-                        chroma_uuid = c['uuid']
-                        name = c['displayName']
-                        level = get_level(name)
-                        chroma_name = name.split('\n')[-1].replace('(', '').replace(')', '')
-                        name_filter = name.split('\n')[0]
-                        displayIcon = c['displayIcon']
-                        videoURL = c['streamedVideo']
-                        chromas.append({
-                                "uuid": chroma_uuid,
-                                "name": name_filter,
-                                "level": level,
-                                "chroma_name": chroma_name,
-                                "displayIcon": displayIcon,
-                                "video": videoURL
-                            })
-                    i.chromas = chromas
-                    if len(raw_levels) < 2:
-                        i.levels = []
-                    else:
-                        for l in raw_levels:
-                            display_name = l["displayName"]
-                            level_item = l["levelItem"]
-                            if level_item:
-                                upg = " - " + level_item.split("::")[-1]
-                            else:
-                                upg = ""
-                            level = get_level(display_name)
-                            if level is None:
-                                if upg is None:
-                                    lvl = "Unknown"
-                                else:
-                                    lvl = upg
-                            else:
-                                lvl = f"Level {level}" + upg
-                            levels.append({
-                                    "uuid": l['uuid'],
-                                    "displayName": l['displayName'],
-                                    "levelName": lvl,
-                                    "video": l['streamedVideo'],
-                                    "displayIcon": l['displayIcon']
-                                })
-                        i.levels = levels
-                    skins.append(i)
-
+                riot_account = await self.dbManager.get_user_by_user_id(0)
+                if riot_account:
+                    pass
+                else:
+                    error = "No Riot Account with user ID 0"
+                try:
+                    auth = await self.client.riot_sessions.authorize(riot_account.user_id, riot_account.username, riot_account.password)
+                except riot_authorization.Exceptions.RiotAuthenticationError:
+                    error = "Riot Authentication Error"
+                except riot_authorization.Exceptions.RiotRatelimitError:
+                    error = "Riot Ratelimit Error"
+                except riot_authorization.Exceptions.RiotMultifactorError:
+                    error = "Riot Multifactor Error"
+                else:
+                    headers = {
+                        "Authorization": f"Bearer {auth.access_token}",
+                        "User-Agent": riot_account.username,
+                        "X-Riot-Entitlements-JWT": auth.entitlements_token,
+                        "X-Riot-ClientPlatform": "ew0KCSJwbGF0Zm9ybVR5cGUiOiAiUEMiLA0KCSJwbGF0Zm9ybU9TIjogIldpbmRvd3MiLA0KCSJwbGF0Zm9ybU9TVmVyc2lvbiI6ICIxMC4wLjE5MDQyLjEuMjU2LjY0Yml0IiwNCgkicGxhdGZvcm1DaGlwc2V0IjogIlVua25vd24iDQp9",
+                        "X-Riot-ClientVersion": client_version
+                    }
+                    raw_offers = await self.client.store_client.getRawOffers(headers, riot_account.region)
+                    all_skins = raw_skins['data']
+                    fetched = time.perf_counter()
+                    offer_costs = {offer["OfferID"].lower(): offer["Cost"].get("85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741") for offer in raw_offers}
+                    skins = []
+                    for s in all_skins:
+                        i = GunSkin()
+                        i.contentTierUUID = s["contentTierUuid"]
+                        if i.contentTierUUID is None:
+                            continue
+                        skin = s["levels"]
+                        for b in skin:
+                            i.displayName = b["displayName"]
+                            i.uuid = b["uuid"].lower()
+                            i.displayIcon = b["displayIcon"]
+                            i.cost = offer_costs.get(i.uuid)
+                            break
+                        raw_levels = s["levels"]
+                        raw_chromas = s["chromas"]
+                        chromas = []
+                        levels = []
 
+                        def get_level(s):
+                            # Find the substring "Level" and the number following it
+                            match = re.search(r'Level (\d+)', s)
+                            if match:
+                                # Return the number as an integer
+                                return int(match.group(1))
+                            else:
+                                # Return None if no match was found
+                                return None
 
+                        for c in raw_chromas:
+                            chroma_uuid = c['uuid']
+                            name = c['displayName']
+                            level = get_level(name)
+                            chroma_name = name.split('\n')[-1].replace('(', '').replace(')', '')
+                            name_filter = name.split('\n')[0]
+                            displayIcon = c['displayIcon']
+                            videoURL = c['streamedVideo']
+                            chromas.append({
+                                    "uuid": chroma_uuid,
+                                    "name": name_filter,
+                                    "level": level,
+                                    "chroma_name": chroma_name,
+                                    "displayIcon": displayIcon,
+                                    "video": videoURL
+                                })
+                        i.chromas = chromas
+                        if len(raw_levels) < 2:
+                            i.levels = []
+                        else:
+                            for l in raw_levels:
+                                display_name = l["displayName"]
+                                level_item = l["levelItem"]
+                                if level_item:
+                                    upg = " - " + level_item.split("::")[-1]
+                                else:
+                                    upg = ""
+                                level = get_level(display_name)
+                                if level is None:
+                                    if upg is None:
+                                        lvl = "Unknown"
+                                    else:
+                                        lvl = upg
+                                else:
+                                    lvl = f"Level {level}" + upg
+                                levels.append({
+                                        "uuid": l['uuid'],
+                                        "displayName": l['displayName'],
+                                        "levelName": lvl,
+                                        "video": l['streamedVideo'],
+                                        "displayIcon": l['displayIcon']
+                                    })
+                            i.levels = levels
+                        skins.append(i)
+                    parsed = time.perf_counter()
 
-                for i in skins:
-                    await self.client.db.execute("INSERT INTO skins(uuid, displayname, cost, displayicon, contenttieruuid, levels, chromas) "
-                                                 "VALUES ($1, $2, $3, $4, $5, $6, $7) ON CONFLICT(uuid) DO UPDATE SET displayName = "
-                                                 "$2, cost = $3, displayIcon = $4, contenttieruuid = $5, levels = $6, chromas = $7", i.uuid,
-                                                 i.displayName, i.cost, i.displayIcon, i.contentTierUUID, json.dumps(i.levels, indent=2), json.dumps(i.chromas, indent=2))
+                    inserted, updated, unchanged = await self.dbManager.merge_skins(skins)
+                    if inserted or updated:
+                        await self.dbManager.load_skin_catalog()
+                    # only remember the validators once the rows are written, so a failed run is retried in full
+                    await self.dbManager.save_catalog_source(SKINS_URL, skins_etag, skins_last_modified, client_version)
+                    written = time.perf_counter()
+                    details = f"{inserted} inserted, {updated} updated, {unchanged} unchanged\n" \
+                              f"Fetch {fetched - started:.1f}s, parse {parsed - fetched:.1f}s, write {written - parsed:.1f}s"
 
         except Exception as e:
             error = str(e)
             print_exception("Ignoring exception while updating skin database, ", e)
-        await self.client.update_service_status("Skin Database Update", upd_time, error)
+        await self.client.update_service_status("Skin Database Update", upd_time, error, details)
 
         """
         Updating Accesories
         """
 
         try:
-            async def fetch_data(url, session):
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    return None
-
-            async with aiohttp.ClientSession() as session:
-                upd_time = int(time.time())
-                error = None
-
-                # Fetch data from APIs
-                player_cards_raw = await fetch_data("https://valorant-api.com/v1/playercards", session)
-                buddies_raw = await fetch_data("https://valorant-api.com/v1/buddies", session)
-                sprays_raw = await fetch_data("https://valorant-api.com/v1/sprays", session)
-                player_title_raw = await fetch_data("https://valorant-api.com/v1/playertitles", session)
-
-                data_to_insert = []
-
-                if player_cards_raw:
-                    for card in player_cards_raw['data']:
-                        uuid = card.get('uuid', None)
-                        name = card.get('displayName', None)
-                        theme_uuid = card.get('themeUuid', None)
-                        display_title = None
-                        display_img = card.get('displayIcon', None)
-                        wide_img = card.get('wideArt', None)
-                        long_img = card.get('largeArt', None)
-                        type = "playercard"
-
-                        if uuid and name:
-                            data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
-
-                if buddies_raw:
-                    for buddy in buddies_raw['data']:
-                        uuid = buddy.get('uuid', None)
-                        name = buddy.get('displayName', None)
-                        theme_uuid = None
-                        display_title = None
-                        display_img = buddy.get('displayIcon', None)
-                        wide_img = None
-                        long_img = None
-                        type = "buddy"
-
-                        if uuid and name:
-                            data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
-
-                if sprays_raw:
-                    for spray in sprays_raw['data']:
-                        uuid = spray.get('uuid', None)
-                        name = spray.get('displayName', None)
-                        theme_uuid = None
-                        display_title = None
-                        display_img = spray.get('animationPng') or spray.get('animationGif', None) or spray.get('fullTransparentIcon') or spray.get("displayIcon")
-                        wide_img = None
-                        long_img = None
-                        type = "spray"
-
-                        if uuid and name:
-                            data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
-
-                if player_title_raw:
-                    for title in player_title_raw['data']:
-                        uuid = title.get('uuid', None)
-                        name = title.get('displayName', None)
-                        theme_uuid = None
-                        display_title = title.get('titleText', None)
-                        display_img = None
-                        wide_img = None
-                        long_img = None
-                        type = "playertitle"
-
-                        if uuid and name:
-                            data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
-
-                await self.client.db.executemany("INSERT INTO accessories(uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type) VALUES($1, $2, $3, $4, $5, $6, $7, $8) ON CONFLICT(uuid) DO UPDATE SET name = $2, theme_uuid = $3, display_title = $4, display_img = $5, wide_img = $6, long_img = $7, type = $8", data_to_insert)
+            upd_time = int(time.time())
+            error = None
+            details = None
+            client_version = self.client.riot_auth_transport.client_version
+            sources = await self.dbManager.get_catalog_sources()
+
+            async def fetch_data(url):
+                source = sources.get(url)
+                if force or source is None or source.get("client_version") != client_version:
+                    return await self.client.store_client.getConditional(url)
+                return await self.client.store_client.getConditional(url, source.get("etag"), source.get("last_modified"))
+
+            started = time.perf_counter()
+            # Fetch data from APIs
+            urls = [*ACCESSORY_URLS.values(), THEMES_URL]
+            responses = dict(zip(urls, await asyncio.gather(*map(fetch_data, urls))))
+            player_cards_raw = responses[ACCESSORY_URLS["playercard"]][1]
+            buddies_raw = responses[ACCESSORY_URLS["buddy"]][1]
+            sprays_raw = responses[ACCESSORY_URLS["spray"]][1]
+            player_title_raw = responses[ACCESSORY_URLS["playertitle"]][1]
+            themes_raw = responses[THEMES_URL][1]
+
+            fetched = time.perf_counter()
+            data_to_insert = []
+
+            if player_cards_raw:
+                for card in player_cards_raw['data']:
+                    uuid = card.get('uuid', None)
+                    name = card.get('displayName', None)
+                    theme_uuid = card.get('themeUuid', None)
+                    display_title = None
+                    display_img = card.get('displayIcon', None)
+                    wide_img = card.get('wideArt', None)
+                    long_img = card.get('largeArt', None)
+                    type = "playercard"
+
+                    if uuid and name:
+                        data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
+
+            if buddies_raw:
+                for buddy in buddies_raw['data']:
+                    uuid = buddy.get('uuid', None)
+                    name = buddy.get('displayName', None)
+                    theme_uuid = None
+                    display_title = None
+                    display_img = buddy.get('displayIcon', None)
+                    wide_img = None
+                    long_img = None
+                    type = "buddy"
+
+                    if uuid and name:
+                        data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
+
+            if sprays_raw:
+                for spray in sprays_raw['data']:
+                    uuid = spray.get('uuid', None)
+                    name = spray.get('displayName', None)
+                    theme_uuid = None
+                    display_title = None
+                    display_img = spray.get('animationPng') or spray.get('animationGif', None) or spray.get('fullTransparentIcon') or spray.get("displayIcon")
+                    wide_img = None
+                    long_img = None
+                    type = "spray"
+
+                    if uuid and name:
+                        data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
+
+            if player_title_raw:
+                for title in player_title_raw['data']:
+                    uuid = title.get('uuid', None)
+                    name = title.get('displayName', None)
+                    theme_uuid = None
+                    display_title = title.get('titleText', None)
+                    display_img = None
+                    wide_img = None
+                    long_img = None
+                    type = "playertitle"
+
+                    if uuid and name:
+                        data_to_insert.append((uuid, name, theme_uuid, display_title, display_img, wide_img, long_img, type))
+
+            themes_to_insert = []
+            if themes_raw:
+                for theme in themes_raw['data']:
+                    uuid = theme.get('uuid', None)
+                    name = theme.get('displayName', None)
+                    if uuid and name:
+                        themes_to_insert.append((uuid, name, theme.get('displayIcon', None)))
+
+            parsed = time.perf_counter()
+            if all(status == 304 for status, *_ in responses.values()):
+                details = f"Not modified since the last refresh ({client_version})"
+            else:
+                inserted, updated, unchanged = await self.dbManager.merge_accessories(data_to_insert)
+                if inserted or updated:
+                    await self.dbManager.load_accessory_index()
+                themes_written = await self.dbManager.merge_themes(themes_to_insert)
+                if themes_written:
+                    await self.dbManager.load_themes()
+                for url, (status, data, etag, last_modified) in responses.items():
+                    if data is not None:
+                        await self.dbManager.save_catalog_source(url, etag, last_modified, client_version)
+                written = time.perf_counter()
+                details = f"{inserted} inserted, {updated} updated, {unchanged} unchanged, {themes_written} themes written\n"
+                not_modified = [name for url, name in SOURCE_NAMES.items() if responses[url][0] == 304]
+                if not_modified:
+                    # the counts only cover the sources that were downloaded
+                    changed = [name for url, name in SOURCE_NAMES.items() if responses[url][0] != 304]
+                    details += f"Counts cover {', '.join(changed)} only, {', '.join(not_modified)} not modified\n"
+                details += f"Fetch {fetched - started:.1f}s, parse {parsed - fetched:.1f}s, write {written - parsed:.1f}s"
 
         except Exception as e:
             error = str(e)
             print_exception("Ignoring exception while updating Accessories database, ", e)
-        await self.client.update_service_status("Accessories Database Update", upd_time, error)
\ No newline at end of file
+        await self.client.update_service_status("Accessories Database Update", upd_time, error, details)
+        return next_run
\ No newline at end of file
@@ -5,6 +5,7 @@ import discord
 from discord.ext import commands
 
 from cogs.maincommands.database import DBManager
+from utils.assets import assets
 from utils.responses import *
 from utils.helper import *
 
@@ -19,16 +20,7 @@ class WishListManager(commands.Cog):
     async def valorant_skin_autocomplete(self, ctx: discord.AutocompleteContext):
         if not self.ready:
             return ["Cypher's Laptop is still booting up. Try again in a few seconds!"]
-        sk = await self.dbManager.get_all_skins()
-
-        if len(ctx.value) > 0:
-            results = []
-            for skin in sk:
-                if ctx.value.lower() in skin.displayName.lower():
-                    results.append(skin.displayName)
-            return results[:25]
-        else:
-            return [s.displayName for s in sk[:25]]
+        return await self.dbManager.search_skins(ctx.value)
 
     async def get_user_wishlisted_skins(self, ctx: discord.AutocompleteContext):
         if not self.ready:
@@ -55,13 +47,10 @@ class WishListManager(commands.Cog):
     async def wishlist(self, ctx):
         wishlist = await self.dbManager.get_user_wishlist(ctx.author.id)
         skins = []
-        tier_uuids = get_tier_data()
         for wish in wishlist:
             sk = await self.dbManager.get_skin_by_uuid(wish)
-            em = ""
-            for tier in tier_uuids:
-                if tier["uuid"] == sk.contentTierUUID:
-                    em = tier["emoji"]
+            tier = assets.tier(sk.contentTierUUID)
+            em = tier["emoji"] if tier is not None else ""
             skins.append(f"{em} {sk.displayName}")
         embed = discord.Embed(title="Wishlist", description="\n".join(skins) if len(skins) > 0 else "You have no skins on your wishlist. Use </wishlist add:1046095784292130946> to add some!", color=self.client.embed_color)
         embed.set_footer(text=f"{len(skins)} skins on your wishlist")
@@ -1,11 +1,11 @@
 import copy
-import json
 from typing import Optional
 
 import discord
 from discord.ext import commands
 
 from cogs.maincommands.database import DBManager
+from utils.assets import assets
 from utils.helper import range_char_from_letter
 from utils.specialobjects import UserSetting
 from utils.helper import range_char
@@ -29,10 +29,7 @@ class SelectCurrency(discord.ui.Select):
         self.currency_range = []
         self.all_currency_options = []
 
-        with open('assets/currencies.json') as f:
-            currencies = json.load(f)
-        for currency in currencies['data']:
-            currency_data = currencies['data'][currency]
+        for currency, currency_data in assets.currencies.items():
             vp_per_dollar = currency_data['vp_per_dollar']
             name = currency_data['name']
             symbol = currency_data['symbol']
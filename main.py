@@ -10,8 +10,20 @@ import datetime
 from dotenv import load_dotenv
 from discord import client
 from discord.ext import commands, tasks
+from utils.assets import assets
 from utils.context import CLVTcontext
+from utils.exchange import ExchangeRates
+from utils.flags import FeatureFlags
 from utils.format import print_exception
+from utils.get_store import StoreClient
+from utils.jsoncodec import init_connection
+from utils.media import MediaCache
+from utils.migrations import migrate
+from utils.prices import price_table
+from utils.render import StoreRenderer
+from utils.riot_authorization import RiotAuthTransport
+from utils.riot_sessions import RiotSessionCache
+from utils.scheduler import Scheduler
 from utils.specialobjects import MISSING
 import aioredis
 
@@ -48,7 +60,16 @@ class clvt(commands.Bot):
         self.uptime = None
         self.embed_color: int = 2829617
         self.db: asyncpg.pool = None
-        self.redis_pool: aioredis.ConnectionPool = None
+        self.redis_pool: Optional[aioredis.Redis] = None
+        self.riot_auth_transport: RiotAuthTransport = None
+        self.riot_sessions: RiotSessionCache = None
+        self.store_client: StoreClient = StoreClient()
+        self.media: MediaCache = MediaCache()
+        self.store_renderer: StoreRenderer = StoreRenderer(self.media)
+        self.scheduler: Scheduler = Scheduler()
+        self.flags: FeatureFlags = FeatureFlags()
+        self.exchange_rates: ExchangeRates = ExchangeRates()
+        self.exchange_rates.add_listener(price_table.set_rates)
         self.serverconfig = {}
         self.maintenance = {}
         self.maintenance_message = {}
@@ -77,33 +98,6 @@ class clvt(commands.Bot):
 
     async def on_ready(self):
         print(f"{datetime.datetime.utcnow().strftime(strfformat)} | Loaded all Server Configurations")
-        all_tables = ['prefixes', "valorant_login", "devmode", "skins", "wishlist", "store_reminder", "cached_stores", "duck_messages", "user_settings", "onetimestores"]
-        print(f"{datetime.datetime.utcnow().strftime(strfformat)} | Checking for missing databases")
-        tables = await self.db.fetch("SELECT table_name FROM information_schema.tables WHERE table_schema='public' AND table_type='BASE TABLE';")
-        tables = [i.get('table_name') for i in tables]
-        if tables is None:
-            pass
-        else:
-            missing_tables = []
-            for table in all_tables:
-                if table not in tables:
-                    missing_tables.append(table)
-            if len(missing_tables) == 0:
-                pass
-            else:
-                print(f"Some databases do not exist, creating them now...")
-                await self.db.execute("""
-                CREATE TABLE IF NOT EXISTS valorant_login(user_id bigint PRIMARY KEY NOT NULL, username text NOT NULL, password bytea NOT NULL, region text NOT NULL);
-                CREATE TABLE IF NOT EXISTS devmode(user_id bigint, enabled boolean);
-                CREATE TABLE IF NOT EXISTS skins(uuid text PRIMARY KEY NOT NULL, displayName text not null, displayIcon text, cost int, contentTierUUID text, levels jsonb, chromas jsonb);
-                CREATE TABLE IF NOT EXISTS prefixes(guild_id bigint PRIMARY KEY NOT NULL, prefix text NOT NULL);
-                CREATE TABLE IF NOT EXISTS wishlist(user_id bigint NOT NULL, skin_uuid text NOT NULL);
-                CREATE TABLE IF NOT EXISTS store_reminder(user_id bigint not null, enabled bool default false not null, show_immediately bool default false not null, picture_mode bool default false not null);
-                CREATE TABLE IF NOT EXISTS cached_stores(user_id bigint not null, store_date date default CURRENT_DATE not null,  skin1_uuid text not null, skin2_uuid text not null, skin3_uuid text not null, skin4_uuid text not null);
-                CREATE TABLE IF NOT EXISTS duck_messages(send_date date not null, message text not null);
-                CREATE TABLE IF NOT EXISTS user_settings(user_id bigint not null PRIMARY KEY, currency text, show_username bool not null default true);
-                CREATE TABLE IF NOT EXISTS onetimestores(user_id bigint not null, store_date date default CURRENT_DATE not null, skin1_uuid text not null, skin2_uuid text not null, skin3_uuid text not null, skin4_uuid text not null);
-                """)
         print(f"{datetime.datetime.utcnow().strftime(strfformat)} | {self.user} ({self.user.id}) is ready")
 
     @property
@@ -111,10 +105,12 @@ class clvt(commands.Bot):
         return self.get_guild(801457328346890241).get_channel(1045982323599999078)
 
     async def is_dev(self, user_id):
+        if self.flags.loaded:
+            return self.flags.is_dev(user_id)
         return await self.db.fetchval("SELECT enabled FROM devmode WHERE user_id=$1", user_id)
 
     async def on_guild_join(self, guild):
-        await self.db.execute('INSERT INTO prefixes VALUES ($1, $2) ON CONFLICT DO UPDATE SET prefix=$2', guild.id, "cl.")
+        await self.db.execute('INSERT INTO prefixes VALUES ($1, $2) ON CONFLICT(guild_id) DO UPDATE SET prefix=$2', guild.id, "cl.")
 
     async def get_prefix(self, message):
         if message.guild is None:
@@ -125,7 +121,7 @@ class clvt(commands.Bot):
         await self.db.execute('UPDATE prefixes SET prefix=$1 WHERE guild_id=$2', prefix, guild.id)
         self.prefixes[guild.id] = prefix
 
-    async def update_service_status(self, service_type, upd_time, error = None):
+    async def update_service_status(self, service_type, upd_time, error = None, details = None):
         if os.getenv('state') == '0': # Production
             types = {
                 "Skin Database Update": 1045986497825878047,
@@ -150,6 +146,8 @@ class clvt(commands.Bot):
                 embed = discord.Embed(title=service_type, color=discord.Color.red())
                 embed.add_field(name="Last Update", value=f"<t:{upd_time}:R>")
                 embed.add_field(name="Error", value=str(error))
+            if details is not None:
+                embed.add_field(name="Details", value=str(details), inline=False)
             try:
                 await webh.edit_message(message_id=types.get(service_type), embed=embed)
             except Exception as e:
@@ -163,6 +161,15 @@ class clvt(commands.Bot):
 
     async def shutdown(self):
         """Cancels tasks and shuts down the bot."""
+        if self.riot_auth_transport is not None:
+            await self.riot_auth_transport.close()
+        await self.scheduler.close()
+        await self.flags.close()
+        await self.exchange_rates.close()
+        self.store_renderer.close()
+        await self.media.close()
+        assets.stop_watching()
+        await self.store_client.close()
         await self.close()
 
     def starter(self):
@@ -175,7 +182,8 @@ class clvt(commands.Bot):
                 port=port,
                 database=database,
                 user=user,
-                password=password
+                password=password,
+                init=init_connection
             ))
         except Exception as e:
             print_exception(f"{datetime.datetime.utcnow().strftime(strfformat)} | Could not connect to databases:", e)
@@ -183,18 +191,29 @@ class clvt(commands.Bot):
             self.uptime = discord.utils.utcnow()
             self.db = pool_pg
             print(f"{datetime.datetime.utcnow().strftime(strfformat)} | Connected to the database")
+            applied = self.loop.run_until_complete(migrate(pool_pg))
+            if len(applied) > 0:
+                print(f"{datetime.datetime.utcnow().strftime(strfformat)} | Applied database migrations {', '.join(map(str, applied))}")
+            self.loop.run_until_complete(self.flags.start(pool_pg))
+            assets.start_watching()
+            self.riot_auth_transport = RiotAuthTransport()
+            self.loop.run_until_complete(self.riot_auth_transport.start())
+            print(f"{datetime.datetime.utcnow().strftime(strfformat)} | Riot client version {self.riot_auth_transport.client_version}")
             try:
                 redis_pool = self.loop.run_until_complete(aioredis.from_url(
                     "redis://localhost",
                     encoding="utf-8"
                 ))
             except Exception as e:
-                print_exception(f"{datetime.datetime.utcnow().strftime(strfformat)} | Could not connect to redis:", e)
+                # Riot sessions and exchange rates are then not shared, every authorization uses the password
+                print_exception(f"{datetime.datetime.utcnow().strftime(strfformat)} | Could not connect to redis, running without it:", e)
             else:
                 self.redis_pool = redis_pool
                 print(f"{datetime.datetime.utcnow().strftime(strfformat)} | Connected to redis")
-                self.loop.create_task(self.after_ready())
-                self.run(token)
+            self.riot_sessions = RiotSessionCache(self.redis_pool, self.riot_auth_transport)
+            self.loop.run_until_complete(self.exchange_rates.start(self.redis_pool, pool_pg))
+            self.loop.create_task(self.after_ready())
+            self.run(token)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,75 @@
+"""
+Checks that the hot queries are planned with the indexes added by the migrations.
+
+Runs the migrations against the Postgres in ``TEST_DATABASE_DSN`` (use a scratch database), then EXPLAINs every
+query with sequential scans disabled, so the plan shows whether a usable index exists even on an empty table.
+Skipped when ``TEST_DATABASE_DSN`` is not set.
+"""
+import datetime
+import json
+import os
+import unittest
+
+import asyncpg
+
+from utils.migrations import migrate
+
+DSN = os.getenv("TEST_DATABASE_DSN")
+TODAY = datetime.date.today()
+
+# (description, query, arguments, index the plan must use)
+HOT_QUERIES = [
+    ("cached store by username", "SELECT * FROM cached_stores WHERE store_date = $1 AND username = $2",
+     (TODAY, "user#tag"), "cached_stores_username_date_key"),
+    ("cached stores of a day", "SELECT user_id FROM cached_stores WHERE store_date = $1",
+     (TODAY,), "cached_stores_date_user_idx"),
+    ("wishlist of a user", "SELECT * FROM wishlist WHERE user_id = $1",
+     (1,), "wishlist_user_skin_key"),
+    ("skin by name or uuid", "SELECT * FROM skins WHERE LOWER(displayname) = $1 OR LOWER(uuid) = $1",
+     ("prime vandal",), "skins_lower_displayname_idx"),
+    ("accessory search", "SELECT * FROM accessories WHERE name LIKE $1",
+     ("%duck%",), "accessories_name_trgm_idx"),
+    ("accessory by name", "SELECT * FROM accessories WHERE name = $1 OR uuid = $1",
+     ("Duck",), "accessories_name_idx"),
+    ("one time store", "SELECT skin1_uuid, skin2_uuid, skin3_uuid, skin4_uuid FROM onetimestores WHERE user_id = $1",
+     (1,), "onetimestores_user_id_idx"),
+    ("reminder settings", "SELECT * FROM store_reminder WHERE user_id = $1",
+     (1,), "store_reminder_user_id_key"),
+]
+
+
+def used_indexes(plan: dict) -> set:
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        indexes |= used_indexes(child)
+    return indexes
+
+
+@unittest.skipUnless(DSN, "TEST_DATABASE_DSN is not set")
+class QueryPlanTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pool = await asyncpg.create_pool(DSN, min_size=1, max_size=1)
+        await migrate(self.pool)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_hot_queries_use_their_index(self):
+        async with self.pool.acquire() as conn:
+            has_trgm = await conn.fetchval("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            await conn.execute("SET enable_seqscan = off")
+            try:
+                for description, query, args, index in HOT_QUERIES:
+                    with self.subTest(description):
+                        if index == "accessories_name_trgm_idx" and not has_trgm:
+                            self.skipTest("pg_trgm is not installed in the test database")
+                        raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+                        plan = json.loads(raw)[0]["Plan"]
+                        self.assertIn(index, used_indexes(plan), f"{description} is planned as {plan['Node Type']}")
+            finally:
+                await conn.execute("RESET enable_seqscan")
+
+
+if __name__ == '__main__':
+    unittest.main()
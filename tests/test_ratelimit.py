@@ -0,0 +1,98 @@
+import asyncio
+import time
+import unittest
+
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+from utils.ratelimit import RiotRateLimiter
+
+
+class RaiseForStatusTest(unittest.IsolatedAsyncioTestCase):
+    """A 429 on a session with raise_for_status, like the auth session, still blocks the bucket."""
+
+    async def asyncSetUp(self):
+        app = web.Application()
+        app.router.add_post("/api/v1/authorization", self.rate_limited)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/api/v1/authorization"
+
+        self.limiter = RiotRateLimiter(host_rates={"127.0.0.1": (100.0, 10)})
+        # the test server stands in for auth.riotgames.com
+        self.limiter.RIOT_HOSTS = ("127.0.0.1",)
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    @staticmethod
+    async def rate_limited(request: web.Request) -> web.Response:
+        return web.Response(status=429, headers={"Retry-After": "0.5"})
+
+    async def test_429_blocks_next_acquire(self):
+        async with aiohttp.ClientSession(raise_for_status=True, trace_configs=[self.limiter.trace_config]) as session:
+            with self.assertRaises(aiohttp.ClientResponseError) as raised:
+                async with session.post(self.url):
+                    pass
+        self.assertEqual(raised.exception.status, 429)
+
+        bucket = self.limiter.get_bucket(URL(self.url))
+        self.assertEqual(bucket.rejections, 1)
+        self.assertEqual(self.limiter.slowdown, 2.0)
+
+        started = time.monotonic()
+        await self.limiter.acquire(URL(self.url))
+        self.assertGreaterEqual(time.monotonic() - started, 0.4)
+
+
+
+class QueuedTimeoutTest(unittest.IsolatedAsyncioTestCase):
+    """Time spent waiting for a token neither counts against the request's total timeout nor disables it."""
+
+    async def asyncSetUp(self):
+        app = web.Application()
+        app.router.add_get("/store/v2/storefront", self.slow)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/store/v2/storefront"
+
+        # one token every 0.2s
+        self.limiter = RiotRateLimiter(host_rates={"127.0.0.1": (5.0, 1)})
+        self.limiter.RIOT_HOSTS = ("127.0.0.1",)
+        self.session = self.limiter.wrap(aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=0.6), trace_configs=[self.limiter.trace_config]
+        ))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.runner.cleanup()
+
+    @staticmethod
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(float(request.query["delay"]))
+        return web.json_response({})
+
+    async def fetch(self, delay: float) -> int:
+        async with self.session.get(self.url, params={"delay": delay}) as r:
+            return r.status
+
+    async def test_queued_request_gets_its_full_timeout(self):
+        # the third request waits 0.4s for its token, then 0.3s for the response
+        statuses = await asyncio.gather(*[self.fetch(0.3) for _ in range(3)])
+        self.assertEqual(statuses, [200] * 3)
+
+    async def test_queued_request_still_times_out(self):
+        # the fifth request waits 0.8s for its token, past the timeout, and must still time out on a slow response
+        results = await asyncio.gather(*[self.fetch(0) for _ in range(4)], self.fetch(1.0), return_exceptions=True)
+        self.assertEqual(results[:4], [200] * 4)
+        self.assertIsInstance(results[4], asyncio.TimeoutError)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from utils.format import print_exception
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class AssetRegistry:
+    """
+    The static JSON files in ``assets/``, parsed once into read-only lookups.
+
+    Content tiers are indexed by uuid, currencies by code and FAQ answers by question, in the order of their
+    files. Everything is frozen, so callers can share the same objects without copying. ``watch`` polls the
+    files' modification times off the event loop and swaps in a fresh copy when one of them changes.
+    """
+
+    def __init__(self, directory: str = "assets"):
+        self.directory = directory
+        self.tiers: Mapping[str, Mapping[str, Any]] = MappingProxyType({})
+        self.currencies: Mapping[str, Mapping[str, Any]] = MappingProxyType({})
+        self.faq: Mapping[str, str] = MappingProxyType({})
+        self._mtimes: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.reload()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read(self, name: str) -> Any:
+        path = self._path(name)
+        self._mtimes[name] = os.stat(path).st_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load(self, name: str) -> None:
+        data = self._read(name)
+        if name == "contenttiers.json":
+            self.tiers = _freeze({tier["uuid"]: tier for tier in data})
+        elif name == "currencies.json":
+            self.currencies = _freeze(data["data"])
+        elif name == "faq.json":
+            self.faq = _freeze({entry["q"]: entry["a"] for entry in data})
+
+    def reload(self) -> None:
+        for name in ("contenttiers.json", "currencies.json", "faq.json"):
+            self._load(name)
+
+    def changed_files(self) -> Tuple[str, ...]:
+        changed = []
+        for name, mtime in self._mtimes.items():
+            try:
+                if os.stat(self._path(name)).st_mtime != mtime:
+                    changed.append(name)
+            except OSError:
+                continue
+        return tuple(changed)
+
+    def reload_if_changed(self) -> Tuple[str, ...]:
+        """Reloads the files modified since they were last read and returns their names."""
+        changed = self.changed_files()
+        for name in changed:
+            try:
+                self._load(name)
+            except (OSError, ValueError, KeyError) as e:
+                # keep serving the previous copy until the file is valid again
+                print_exception(f"Could not reload assets/{name}: ", e)
+        return changed
+
+    def tier(self, uuid: Optional[str]) -> Optional[Mapping[str, Any]]:
+        return self.tiers.get(uuid)
+
+    def currency(self, code: Optional[str]) -> Optional[Mapping[str, Any]]:
+        if code is None:
+            return None
+        return self.currencies.get(code.upper())
+
+    async def watch(self, interval: float = 30) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            changed = await asyncio.to_thread(self.reload_if_changed)
+            if changed:
+                print(f"Reloaded {', '.join(changed)}")
+
+    def start_watching(self, interval: float = 30) -> None:
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self.watch(interval))
+
+    def stop_watching(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+assets = AssetRegistry()
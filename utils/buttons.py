@@ -1,3 +1,4 @@
+from io import BytesIO
 from urllib.parse import urlencode
 
 import time
@@ -14,6 +15,8 @@ from cogs.maincommands.database import DBManager
 from utils.context import CLVTcontext
 from discord.ext import commands, pages
 from utils.context import CLVTcontext
+from utils.assets import assets
+from utils.format import print_exception
 from utils.helper import BaseEmbed
 from utils.responses import *
 from utils.specialobjects import GunSkin, NightMarketGunSkin
@@ -266,9 +269,7 @@ class ViewAuthor(BaseView):
 
 class NightMarketSkinReveal(discord.ui.Button):
     def __init__(self, skin: NightMarketGunSkin, seen: bool, index: int, respond_embed: discord.Embed):
-        tier_uuids = get_tier_data()
-        tier = next((x for x in tier_uuids if x["uuid"] == skin.contentTierUUID), None)
-        self.tier_details = tier
+        self.tier_details = assets.tier(skin.contentTierUUID)
         self.skin = skin
         self.seen = seen
         self.index = index
@@ -355,6 +356,30 @@ class ThumbnailToImageOnly(discord.ui.View):
         button.emoji = new_emoji
         await interaction.response.edit_message(embeds=new_embeds, view=self)
 
+    @discord.ui.button(style=discord.ButtonStyle.grey, emoji="🖼️", custom_id="store_picture_v1")
+    async def picture(self, button: discord.ui.Button, interaction: discord.Interaction):
+        db_manager = DBManager(interaction.client.db)
+        skins = []
+        wishlist = set()
+        for embed in interaction.message.embeds[1:]:
+            skin = await db_manager.get_skin_by_name_or_uuid(embed.title)
+            if skin:
+                skins.append(skin)
+                if getattr(embed.footer, "text", None) == "This skin is in your wishlist!":
+                    wishlist.add(skin.uuid)
+        if len(skins) == 0:
+            return await interaction.response.send_message("There are no skins to show as a picture.", ephemeral=True)
+        await interaction.response.defer()
+        user_settings = await db_manager.fetch_user_settings(interaction.user.id)
+        try:
+            image = await interaction.client.store_renderer.render(skins, user_settings.currency, wishlist)
+        except Exception as e:
+            # the message keeps its embeds and buttons
+            print_exception("Could not render store picture, ", e)
+            return await interaction.followup.send("The picture couldn't be drawn right now, try again later.", ephemeral=True)
+        header = interaction.message.embeds[0].set_image(url="attachment://store.png")
+        await interaction.edit_original_response(embeds=[header], file=discord.File(BytesIO(image), "store.png"), view=None)
+
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.message.interaction is not None:
             if interaction.user.id != interaction.message.interaction.user.id:
@@ -817,20 +842,15 @@ class SuggestionDeveloperView(discord.ui.View):
 class FAQMenu(discord.ui.Select):
     def __init__(self):
 
-        with open('assets/faq.json', 'r') as f:
-            self.faq = json.load(f)
         options = []
-        for i in self.faq:
-            cut_description = i.get('a')[:50] + "..." if len(i.get('a')) > 50 else i.get('a')
-            op = discord.SelectOption(label=i.get('q'), value=i.get('q'), description=cut_description)
+        for q, a in assets.faq.items():
+            cut_description = a[:50] + "..." if len(a) > 50 else a
+            op = discord.SelectOption(label=q, value=q, description=cut_description)
             options.append(op)
         super().__init__(custom_id="faq_menuv1", placeholder="Select a FAQ", options=options)
 
     async def callback(self, interaction: discord.Interaction):
-        a = "Undefined"
-        for i in self.faq:
-            if i.get('q') == self.values[0]:
-                a = i.get('a')
+        a = assets.faq.get(self.values[0], "Undefined")
         embed = discord.Embed(title=self.values[0], description=a)
         embed.set_author(name="Cypher's Laptop", icon_url="https://cdn.discordapp.com/avatars/844489130822074390/ab663738f44bf18062f0a5f77cf4ebdd.png?size=32")
         for i in self.options:
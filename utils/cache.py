@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    A small least-recently-used mapping with a fixed maximum size.
+
+    The size is the number of entries, or the sum of ``weigh(value)`` when a weigher is given, e.g. ``len`` to
+    bound a cache of bytes by memory.
+    """
+
+    def __init__(self, maxsize: int = 1024, weigh: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.weigh = weigh
+        self.size = 0
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def _weight(self, value: Any) -> int:
+        return 1 if self.weigh is None else self.weigh(value)
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if key in self._data:
+            self.size -= self._weight(self._data[key])
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self.size += self._weight(value)
+        while self.size > self.maxsize and self._data:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= self._weight(evicted)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        if key not in self._data:
+            return default
+        value = self._data.pop(key)
+        self.size -= self._weight(value)
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+
+# write-through caches of the user_settings and store_reminder rows, keyed by Discord user id
+user_settings_cache = LRUCache(4096)
+reminder_config_cache = LRUCache(4096)
@@ -0,0 +1,46 @@
+import time
+from types import MappingProxyType
+from typing import Iterable, Optional
+
+from utils.search import SearchIndex
+from utils.specialobjects import GunSkin
+
+
+class SkinCatalog:
+    """
+    An immutable, in-memory snapshot of the ``skins`` table.
+
+    Skins are indexed by uuid and by lower-cased display name. A refresh builds a new catalog and swaps it
+    in with a single assignment, so readers never see a half-built index. The GunSkin objects are shared
+    between callers and must be treated as read-only.
+    """
+    __slots__ = ('skins', 'loaded_at', 'search_index', '_by_uuid', '_by_name')
+
+    def __init__(self, skins: Iterable[GunSkin]):
+        self.skins: tuple[GunSkin, ...] = tuple(skins)
+        self.loaded_at: float = time.time()
+        by_uuid = {}
+        by_name = {}
+        for skin in self.skins:
+            by_uuid.setdefault(skin.uuid.lower(), skin)
+            if skin.displayName is not None:
+                by_name.setdefault(skin.displayName.lower(), skin)
+        self._by_uuid = MappingProxyType(by_uuid)
+        self._by_name = MappingProxyType(by_name)
+        self.search_index = SearchIndex.from_names(skin.displayName for skin in self.skins if skin.displayName is not None)
+
+    def __len__(self) -> int:
+        return len(self.skins)
+
+    def __contains__(self, skin_uuid: str) -> bool:
+        return skin_uuid.lower() in self._by_uuid
+
+    def get(self, skin_uuid: str) -> Optional[GunSkin]:
+        return self._by_uuid.get(skin_uuid.lower())
+
+    def get_by_name_or_uuid(self, query: str) -> Optional[GunSkin]:
+        query = query.lower()
+        return self._by_name.get(query) or self._by_uuid.get(query)
+
+    def __repr__(self) -> str:
+        return f"<SkinCatalog skins={len(self.skins)} loaded_at={self.loaded_at}>"
@@ -34,7 +34,7 @@ def base_dev() -> callable:
 
 def dev() -> callable:
     async def predicate(ctx: CLVTcontext):
-        enabled = await ctx.bot.db.fetchval("SELECT enabled FROM devmode WHERE user_id = $1", ctx.author.id)
+        enabled = await ctx.bot.is_dev(ctx.author.id)
         if enabled != True:
             raise ArgumentBaseError(message="Only developers can use this command. If you are a developer, turn on Developer mode.")
         return True
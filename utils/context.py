@@ -123,6 +123,8 @@ class CLVTcontext(commands.Context):
         """
         Checks if the invoking user is a bot developer.
         """
+        if self.bot.flags.loaded:
+            return self.bot.flags.is_bot_dev(self.message.author.id)
         return True if (await self.bot.db.fetchrow("SELECT * FROM devmode WHERE user_id = $1", self.message.author.id)) else False
 
     @property
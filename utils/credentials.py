@@ -0,0 +1,47 @@
+import os
+from typing import Optional
+
+from cryptography.fernet import Fernet, MultiFernet
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class CredentialVault:
+    """
+    Encrypts and decrypts stored Riot passwords and sessions.
+
+    The key material is read once from ``FERNET_KEY``. It may hold several comma separated keys, newest first:
+    new tokens are encrypted with the first key and tokens made with any of the others still decrypt, so a key
+    can be rotated without logging everyone out.
+    """
+
+    def __init__(self, keys: Optional[str] = None):
+        self._keys = keys
+        self._fernet: Optional[MultiFernet] = None
+
+    @property
+    def fernet(self) -> MultiFernet:
+        if self._fernet is None:
+            keys = self._keys or os.getenv("FERNET_KEY")
+            self._fernet = MultiFernet([Fernet(key.strip()) for key in keys.split(",") if key.strip()])
+        return self._fernet
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self.fernet.encrypt(data)
+
+    def decrypt(self, token: bytes) -> bytes:
+        return self.fernet.decrypt(token)
+
+    def encrypt_password(self, password: str) -> bytes:
+        return self.encrypt(password.encode("utf-8"))
+
+    def decrypt_password(self, token: bytes) -> str:
+        return self.decrypt(token).decode("utf-8")
+
+    def rotate(self, token: bytes) -> bytes:
+        """Re-encrypts a token with the current primary key."""
+        return self.fernet.rotate(token)
+
+
+credential_vault = CredentialVault()
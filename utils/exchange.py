@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import os
+import random
+import time
+from typing import Callable, Dict, Optional
+
+import aiohttp
+import asyncpg
+from dotenv import load_dotenv
+
+from utils import jsoncodec
+from utils.format import print_exception
+from utils.singleflight import SingleFlight
+
+load_dotenv()
+
+RatesListener = Callable[[Dict[str, float], float], None]
+
+
+class ExchangeRates:
+    """
+    USD-relative exchange rates from freecurrencyapi.com, cached in two tiers with stale-while-revalidate.
+
+    The parsed rates are kept in memory and shared with other processes through Redis. Readers always get the
+    in-memory copy immediately; once it is older than ``ttl`` a revalidation is started in the background. It
+    first adopts a newer copy from Redis and only calls the API when Redis has nothing fresher. Concurrent
+    revalidations in one process share a single flight. A background task also revalidates every ``ttl``
+    seconds plus jitter, so processes started together don't call the API at the same time.
+
+    Every successful fetch is saved to Postgres as the last good snapshot. It is loaded at startup when Redis
+    is empty, and it stays in use for as long as the API keeps failing.
+    """
+    REDIS_KEY = "exchange_rates"
+    API_URL = "https://api.freecurrencyapi.com/v1/latest"
+
+    def __init__(self, ttl: float = 86400, jitter: float = 1800, retry_after: float = 300):
+        self.ttl = ttl
+        self.jitter = jitter
+        self.retry_after = retry_after
+        self.redis = None
+        self.pool: Optional[asyncpg.Pool] = None
+        self.rates: Dict[str, float] = {}
+        self.fetched_at: Optional[float] = None
+        self.listeners: list[RatesListener] = []
+        self._flights = SingleFlight()
+        self._last_attempt: float = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, listener: RatesListener) -> None:
+        self.listeners.append(listener)
+        if self.fetched_at is not None:
+            listener(self.rates, self.fetched_at)
+
+    async def start(self, redis, pool: asyncpg.Pool) -> None:
+        self.redis = redis
+        self.pool = pool
+        try:
+            snapshot = await self._read_redis() or await self._read_snapshot()
+        except Exception as e:
+            print_exception("Could not load the cached exchange rates: ", e)
+        else:
+            if snapshot is not None:
+                self._set(*snapshot)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def is_stale(self) -> bool:
+        return self.fetched_at is None or time.time() - self.fetched_at >= self.ttl
+
+    def get(self) -> Dict[str, float]:
+        """The last known rates, never waits. Starts a revalidation in the background if they are stale."""
+        if self.is_stale() and self.pool is not None and time.time() - self._last_attempt >= self.retry_after:
+            asyncio.ensure_future(self.revalidate())
+        return self.rates
+
+    async def revalidate(self) -> Dict[str, float]:
+        return await self._flights.do("rates", self._revalidate)
+
+    async def _revalidate(self) -> Dict[str, float]:
+        self._last_attempt = time.time()
+        try:
+            try:
+                snapshot = await self._read_redis()
+            except Exception as e:
+                print_exception("Could not read exchange rates from redis: ", e)
+                snapshot = None
+            if snapshot is not None and (self.fetched_at is None or snapshot[1] > self.fetched_at):
+                self._set(*snapshot)
+            if not self.is_stale():
+                return self.rates
+            rates = await self._fetch()
+            fetched_at = time.time()
+            self._set(rates, fetched_at)
+            await self._write(rates, fetched_at)
+        except Exception as e:
+            # keep serving the last good rates
+            print_exception("Could not refresh exchange rates: ", e)
+        return self.rates
+
+    def _set(self, rates: Dict[str, float], fetched_at: float) -> None:
+        self.rates = rates
+        self.fetched_at = fetched_at
+        for listener in self.listeners:
+            listener(rates, fetched_at)
+
+    async def _fetch(self) -> Dict[str, float]:
+        headers = {"apikey": os.getenv("CURRENCY_API")}
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
+            async with session.get(self.API_URL, headers=headers) as resp:
+                resp.raise_for_status()
+                return (await resp.json())["data"]
+
+    async def _read_redis(self) -> Optional[tuple]:
+        if self.redis is None:
+            return None
+        raw = await self.redis.get(self.REDIS_KEY)
+        if raw is None:
+            return None
+        data = jsoncodec.loads(raw)
+        return data["rates"], data["fetched_at"]
+
+    async def _read_snapshot(self) -> Optional[tuple]:
+        record = await self.pool.fetchrow("SELECT rates, fetched_at FROM exchange_rates WHERE id = 1")
+        if record is None:
+            return None
+        return jsoncodec.loads(record.get("rates")), record.get("fetched_at").timestamp()
+
+    async def _write(self, rates: Dict[str, float], fetched_at: float) -> None:
+        if self.redis is not None:
+            await self.redis.set(self.REDIS_KEY, jsoncodec.dumps({"rates": rates, "fetched_at": fetched_at}))
+        await self.pool.execute(
+            "INSERT INTO exchange_rates(id, rates, fetched_at) VALUES (1, $1, $2) "
+            "ON CONFLICT(id) DO UPDATE SET rates = $1, fetched_at = $2",
+            rates, datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc)
+        )
+
+    async def _run(self) -> None:
+        while True:
+            if self.fetched_at is not None:
+                await asyncio.sleep(max(0.0, self.fetched_at + self.ttl - time.time()) + random.uniform(0, self.jitter))
+            await self.revalidate()
+            if self.is_stale():
+                # the API is failing, try again a little later
+                await asyncio.sleep(self.retry_after)
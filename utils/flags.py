@@ -0,0 +1,87 @@
+import asyncio
+from typing import Dict, Optional
+
+import asyncpg
+
+from utils.format import print_exception
+
+
+class FeatureFlags:
+    """
+    In-memory copy of the ``temptable`` kill switch and the ``devmode`` table.
+
+    Both are loaded at startup and reloaded whenever a trigger on either table sends a ``config_changed``
+    notification, so the checks that run on every command are dictionary lookups instead of queries.
+    """
+    CHANNEL = "config_changed"
+
+    def __init__(self):
+        self.pool: Optional[asyncpg.Pool] = None
+        self.limited: Optional[bool] = None
+        # user_id -> whether developer mode is enabled, every user in devmode is a bot developer
+        self.devmode: Dict[int, bool] = {}
+        self.loaded = False
+        self._listener: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def start(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        await self.listen()
+        await self.reload()
+
+    async def listen(self) -> None:
+        # a dedicated connection, LISTEN doesn't survive being returned to the pool
+        self._listener = await self.pool.acquire()
+        await self._listener.add_listener(self.CHANNEL, self._on_notify)
+        self._listener.add_termination_listener(self._on_terminate)
+
+    async def reload(self, table: Optional[str] = None) -> None:
+        if table in (None, "temptable"):
+            self.limited = await self.pool.fetchval("SELECT enabled FROM temptable WHERE enabled IS NOT NULL")
+        if table in (None, "devmode"):
+            records = await self.pool.fetch("SELECT user_id, enabled FROM devmode")
+            self.devmode = {r.get("user_id"): r.get("enabled") is True for r in records}
+        self.loaded = True
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        asyncio.create_task(self.reload(payload or None))
+
+    def _on_terminate(self, connection) -> None:
+        # notifications sent while disconnected are lost, so reload everything once listening again
+        self.loaded = False
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        if self._listener is not None:
+            try:
+                await self.pool.release(self._listener)
+            except Exception:
+                pass
+            self._listener = None
+        while True:
+            try:
+                await self.listen()
+                await self.reload()
+                return
+            except Exception as e:
+                print_exception("Failed to re-listen for config changes, retrying in 5 seconds: ", e)
+                await asyncio.sleep(5)
+
+    async def close(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._listener is not None:
+            await self._listener.remove_listener(self.CHANNEL, self._on_notify)
+            await self.pool.release(self._listener)
+            self._listener = None
+
+    def is_limited(self) -> bool:
+        return self.limited is True
+
+    def is_bot_dev(self, user_id: int) -> bool:
+        return user_id in self.devmode
+
+    def is_dev(self, user_id: int) -> bool:
+        """Whether the user has developer mode turned on."""
+        return self.devmode.get(user_id, False)
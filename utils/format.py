@@ -336,17 +336,18 @@ def grammarformat(iterable):
     return ', '.join(iterable[:-1]) + ', and ' + iterable[-1]
 
 
-async def get_image(url:str):
-    async with aiohttp.ClientSession() as session:
-        try:
+async def get_image(url:str, media=None):
+    """Downloads an image, through ``media`` (the bot's MediaCache) when given."""
+    try:
+        if media is not None:
+            return await media.get(url)
+        async with aiohttp.ClientSession() as session:
             async with session.get(url) as r:
-                data = await r.read()
-        except aiohttp.InvalidURL:
-            raise ArgumentBaseError(message=f"Invalid URL: {url}")
-        except aiohttp.ClientError:
-            raise ArgumentBaseError(message="Something went wrong while trying to get the image.")
-        else:
-            return data
+                return await r.read()
+    except aiohttp.InvalidURL:
+        raise ArgumentBaseError(message=f"Invalid URL: {url}")
+    except aiohttp.ClientError:
+        raise ArgumentBaseError(message="Something went wrong while trying to get the image.")
 
 
 def generate_loadbar(percentage: float, length: Optional[int] = 20):
@@ -1,60 +1,128 @@
 import itertools
 import json
+import time
+from typing import Dict, Optional, Tuple
+
 import aiohttp
+from yarl import URL
+
+from .ratelimit import LimitedSession, RiotRateLimiter, riot_ratelimiter
+from .singleflight import SingleFlight
+from .specialobjects import StorefrontSnapshot
 from .time import humanize_timedelta
 
 
-async def getStore(headers, user_id, region) -> (list[str], int):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://pd.{region}.a.pvp.net/store/v2/storefront/{user_id}/", headers=headers) as r:  # gets user's store, returns a json['SingleItemOffers'] that has a list of VALORANT skins the user has in the shop in the form of UUIDs
+class StoreClient:
+    """
+    Reusable HTTP client for the VALORANT store endpoints and valorant-api.com.
+
+    Each host (one per pd.{region}.a.pvp.net shard, plus valorant-api.com) gets its own pooled keep-alive
+    session with DNS caching, so store and balance fetches reuse warm connections. Owned by the bot and
+    closed on shutdown.
+    """
+
+    def __init__(self, limit_per_host: int = 10, timeout: float = 15.0, keepalive_timeout: float = 60.0,
+                 rate_limiter: RiotRateLimiter = riot_ratelimiter):
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.rate_limiter = rate_limiter
+        self._sessions: Dict[str, LimitedSession] = {}
+        self._storefront_flights = SingleFlight()
+        self._storefronts: Dict[tuple, StorefrontSnapshot] = {}
+
+    def session_for(self, host: str) -> LimitedSession:
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            session = self.rate_limiter.wrap(aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self.rate_limiter.trace_config],
+            ))
+            self._sessions[host] = session
+        return session
+
+    def pd_session(self, region: str) -> LimitedSession:
+        return self.session_for(f"pd.{region}.a.pvp.net")
+
+    async def close(self):
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+
+    async def getStorefront(self, headers, user_id, region) -> StorefrontSnapshot:
+        """
+        Returns the account's storefront, served from memory until its earliest section resets.
+        """
+        key = (region, user_id)
+        now = time.time()
+        snapshot = self._storefronts.get(key)
+        if snapshot is not None and snapshot.expires_at > now:
+            return snapshot
+        # concurrent requests for the same account share one storefront fetch
+        return await self._storefront_flights.do(key, self._getStorefront, headers, user_id, region)
+
+    async def _getStorefront(self, headers, user_id, region) -> StorefrontSnapshot:
+        async with self.pd_session(region).get(f"https://pd.{region}.a.pvp.net/store/v2/storefront/{user_id}/", headers=headers) as r:  # gets user's store, returns a json['SingleItemOffers'] that has a list of VALORANT skins the user has in the shop in the form of UUIDs
             data = await r.json()
-    skin_panel = data['SkinsPanelLayout']
-    skins = []
-    for skin_uuid in skin_panel['SingleItemOffers']:
-        skin_uuid = skin_uuid.lower()
-        skins.append(skin_uuid)
-    return skins, skin_panel['SingleItemOffersRemainingDurationInSeconds']
-
+        now = time.time()
+        snapshot = StorefrontSnapshot(data, now)
+        self._storefronts = {k: v for k, v in self._storefronts.items() if v.expires_at > now}
+        self._storefronts[(region, user_id)] = snapshot
+        return snapshot
+
+    async def getStore(self, headers, user_id, region) -> (list[str], int):
+        snapshot = await self.getStorefront(headers, user_id, region)
+        return snapshot.skins, snapshot.remaining(snapshot.skins_remaining, time.time())
+
+    async def getNightMarket(self, headers, user_id, region):
+        try:
+            snapshot = await self.getStorefront(headers, user_id, region)
+        except KeyError:  # riot responded without a storefront
+            return None, 0
+        #data = json.loads(open("assets/sample_response_with_night.json", "r").read())
+        if snapshot.night_market is None:  # no night market
+            return None, 0
+        return snapshot.night_market, snapshot.remaining(snapshot.night_market_remaining, time.time())
+
+    async def getConditional(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Tuple[int, Optional[dict], Optional[str], Optional[str]]:
+        """
+        GETs a JSON document, revalidating it with the stored ``ETag``/``Last-Modified`` validators.
+
+        Returns ``(status, data, etag, last_modified)``. ``data`` is None when the server answered 304 or failed,
+        in which case the passed validators are returned unchanged.
+        """
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        async with self.session_for(URL(url).host).get(url, headers=headers) as r:
+            if r.status != 200:
+                return r.status, None, etag, last_modified
+            data = await r.json()
+            return r.status, data, r.headers.get("ETag"), r.headers.get("Last-Modified")
 
-async def getNightMarket(headers, user_id, region):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://pd.{region}.a.pvp.net/store/v2/storefront/{user_id}/", headers=headers) as r:
+    async def getAllSkins(self):
+        async with self.session_for("valorant-api.com").get(f"https://valorant-api.com/v1/weapons/skins") as r:
             data = await r.json()
-    #data = json.loads(open("assets/sample_response_with_night.json", "r").read())
-    try:
-        night_market = data["BonusStore"]
-        night_market_offers = night_market["BonusStoreOffers"]
-        skins = []
-        for item in night_market_offers:
-            uuid: str = item["Offer"]["OfferID"].lower()
-            org_cost: int = item["Offer"]["Cost"]["85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741"]
-            discounted_p: int = item["DiscountPercent"]
-            discounted_cost: int = item["DiscountCosts"]["85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741"]
-            is_seen: bool = item["IsSeen"]
-            skins.append((uuid, org_cost, discounted_p, discounted_cost, is_seen))
-        return skins, night_market["BonusStoreRemainingDurationInSeconds"]
-    except KeyError: # no night market
-        return None, 0
-
-
-async def getAllSkins():
-    async with aiohttp.ClientSession() as session:
-         async with session.get(f"https://valorant-api.com/v1/weapons/skins") as r:
-             data = await r.json()
-    return data.get('data')
-
-
-
-async def getRawOffers(headers, region):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://pd.{region}.a.pvp.net/store/v1/offers/",
-                               headers=headers) as r:  # gets all sellable skins from the official VALORANT API, along with their costs ?
+        return data.get('data')
+
+    async def getRawOffers(self, headers, region):
+        async with self.pd_session(region).get(f"https://pd.{region}.a.pvp.net/store/v1/offers/",
+                                               headers=headers) as r:  # gets all sellable skins from the official VALORANT API, along with their costs ?
             offers = await r.json()
-    return offers["Offers"]
+        return offers["Offers"]
 
-async def getSkinDetails(headers, skin_panel, region):
-    offers = await getRawOffers(headers, region)
-    async with aiohttp.ClientSession() as session:
+    async def getSkinDetails(self, headers, skin_panel, region):
+        offers = await self.getRawOffers(headers, region)
+        session = self.session_for("valorant-api.com")
         skin_names = []
         for item in skin_panel['SingleItemOffers']:
             async with session.get(f"https://valorant-api.com/v1/weapons/skinlevels/{item}/", headers=headers) as r:  # gets the details of a single skin returned from VALORANT API's v2 storefront through the unofficial VALORANT API.
@@ -72,15 +140,14 @@ async def getSkinDetails(headers, skin_panel, region):
 
         return offer_skins, humanize_timedelta(seconds=skin_panel['SingleItemOffersRemainingDurationInSeconds'])
 
-
-async def getBalance(headers, puuid, region):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://pd.{region}.a.pvp.net/store/v1/wallet/{puuid}", headers=headers, json={}) as r:
+    async def getBalance(self, headers, puuid, region):
+        async with self.pd_session(region).get(f"https://pd.{region}.a.pvp.net/store/v1/wallet/{puuid}", headers=headers, json={}) as r:
             data = await r.json()
-    balances = data['Balances']
-    return balances['85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741'], balances['e59aa87c-4cbf-517a-5983-6e81511be9b7'], balances['85ca954a-41f2-ce94-9b45-8ca3dd39a00d'], balances['f08d4ae3-939c-4576-ab26-09ce1f23bb37']
+        balances = data['Balances']
+        return balances['85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741'], balances['e59aa87c-4cbf-517a-5983-6e81511be9b7'], balances['85ca954a-41f2-ce94-9b45-8ca3dd39a00d'], balances['f08d4ae3-939c-4576-ab26-09ce1f23bb37']
 
 
 async def check_limited_function(client):
+    if client.flags.loaded:
+        return client.flags.limited
     return await client.db.fetchval("SELECT enabled FROM temptable WHERE enabled IS NOT NULL")
-
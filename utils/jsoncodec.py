@@ -0,0 +1,42 @@
+import json
+from typing import Any, Union
+
+import asyncpg
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library is only slower
+    orjson = None
+
+# the binary jsonb wire format is a version byte followed by the JSON text
+_JSONB_VERSION = b"\x01"
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializes ``obj`` to compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    # strings are taken as already serialized JSON, like asyncpg's default jsonb codec
+    if isinstance(value, str):
+        return _JSONB_VERSION + value.encode("utf-8")
+    return _JSONB_VERSION + dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> str:
+    # decoding is left to the caller, most reads never look at the JSON columns
+    return bytes(data[1:]).decode("utf-8")
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Pool ``init`` hook that registers the jsonb codec on every new connection."""
+    await conn.set_type_codec("jsonb", encoder=_encode_jsonb, decoder=_decode_jsonb, schema="pg_catalog", format="binary")
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from utils.cache import LRUCache
+from utils.singleflight import SingleFlight
+
+
+class MediaCache:
+    """
+    Downloaded images, stored on disk by the SHA-256 of their content behind an in-memory LRU.
+
+    ``urls/`` maps the hash of each URL to the digest of what it served and ``blobs/`` holds every distinct
+    file once, so icons shared by several skins or chromas are only stored once. A URL is downloaded again
+    once its entry is older than ``ttl``. When the blobs grow past ``max_bytes`` the least recently used ones
+    are deleted until they are back under 90% of it, along with expired URL entries. The most recently
+    used files are also kept in memory, up to ``memory_bytes``.
+
+    Downloads go through one session of the cache's own, outside the Riot rate limiter since URLs can point
+    at any host, and concurrent requests for the same URL share a single download. Disk access runs in a
+    thread so it never blocks the event loop. Owned by the bot and closed on shutdown.
+    """
+
+    def __init__(self, directory: str = "cache/media", max_bytes: int = 512 * 1024 * 1024, ttl: float = 7 * 86400,
+                 memory_bytes: int = 32 * 1024 * 1024, timeout: float = 15.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # url -> (expires at, data)
+        self.memory = LRUCache(memory_bytes, weigh=lambda entry: len(entry[1]))
+        self.disk_bytes: Optional[int] = None
+        self.disk_hits = 0
+        self.downloads = 0
+        self.disk_evictions = 0
+        self._flights = SingleFlight()
+        self._evicting: Optional[asyncio.Task] = None
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=10, ttl_dns_cache=300), timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.directory, "urls", hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest)
+
+    def _read(self, url: str) -> Optional[Tuple[bytes, float]]:
+        """The cached file and when it was downloaded, or None if it isn't cached or has expired."""
+        url_path = self._url_path(url)
+        try:
+            downloaded_at = os.stat(url_path).st_mtime
+            if time.time() - downloaded_at >= self.ttl:
+                return None
+            with open(url_path, "r") as f:
+                blob_path = self._blob_path(f.read().strip())
+            with open(blob_path, "rb") as f:
+                data = f.read()
+            # the blob's modification time orders eviction, least recently used first
+            os.utime(blob_path)
+        except FileNotFoundError:
+            # evicted in between, downloaded again
+            return None
+        return data, downloaded_at
+
+    def _write(self, url: str, data: bytes) -> int:
+        """Stores the file and returns how many bytes were added to the blobs."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        added = 0
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # written under a temporary name first so a reader never sees a partial file
+            with open(f"{blob_path}.tmp", "wb") as f:
+                f.write(data)
+            os.replace(f"{blob_path}.tmp", blob_path)
+            added = len(data)
+        url_path = self._url_path(url)
+        os.makedirs(os.path.dirname(url_path), exist_ok=True)
+        with open(f"{url_path}.tmp", "w") as f:
+            f.write(digest)
+        os.replace(f"{url_path}.tmp", url_path)
+        return added
+
+    @staticmethod
+    def _scan(directory: str) -> Dict[str, os.stat_result]:
+        try:
+            return {entry.path: entry.stat() for entry in os.scandir(directory) if entry.is_file() and not entry.name.endswith(".tmp")}
+        except FileNotFoundError:
+            return {}
+
+    def _disk_usage(self) -> int:
+        return sum(stat.st_size for stat in self._scan(os.path.join(self.directory, "blobs")).values())
+
+    def _evict(self) -> int:
+        """Deletes expired URL entries and the least recently used blobs, returns the size of the blobs left."""
+        now = time.time()
+        for path, stat in self._scan(os.path.join(self.directory, "urls")).items():
+            if now - stat.st_mtime >= self.ttl:
+                os.remove(path)
+        blobs = sorted(self._scan(os.path.join(self.directory, "blobs")).items(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in blobs)
+        for path, stat in blobs:
+            if total <= self.max_bytes * 0.9:
+                break
+            # URL entries that still point here become misses and are downloaded again
+            os.remove(path)
+            total -= stat.st_size
+            self.disk_evictions += 1
+        return total
+
+    async def _run_eviction(self) -> None:
+        self.disk_bytes = await asyncio.to_thread(self._evict)
+
+    async def _download(self, url: str) -> bytes:
+        async with self.session.get(url) as resp:
+            resp.raise_for_status()
+            data = await resp.read()
+        self.downloads += 1
+        added = await asyncio.to_thread(self._write, url, data)
+        if self.disk_bytes is None:
+            self.disk_bytes = await asyncio.to_thread(self._disk_usage)
+        else:
+            self.disk_bytes += added
+        if self.disk_bytes > self.max_bytes and (self._evicting is None or self._evicting.done()):
+            self._evicting = asyncio.create_task(self._run_eviction())
+        return data
+
+    async def get(self, url: str) -> bytes:
+        """The file at ``url``, downloaded only when it isn't cached or its entry has expired."""
+        entry = self.memory.get(url)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+        cached = await asyncio.to_thread(self._read, url)
+        if cached is not None:
+            self.disk_hits += 1
+            data, downloaded_at = cached
+        else:
+            data = await self._flights.do(url, self._download, url)
+            downloaded_at = time.time()
+        self.memory.set(url, (downloaded_at + self.ttl, data))
+        return data
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "downloads": self.downloads,
+            "memory_bytes": self.memory.size,
+            "memory_evictions": self.memory.evictions,
+            "disk_bytes": self.disk_bytes or 0,
+            "disk_evictions": self.disk_evictions,
+        }
+
+    def __repr__(self) -> str:
+        return f"<MediaCache {' '.join(f'{k}={v}' for k, v in self.stats.items())}>"
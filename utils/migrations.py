@@ -0,0 +1,114 @@
+from typing import List, Tuple
+
+import asyncpg
+
+# arbitrary key for pg_advisory_lock, so that two instances starting together don't migrate at the same time
+MIGRATION_LOCK = 0x636C7674
+
+# (version, name, sql), applied in order. Never edit a migration that has shipped, add a new one instead.
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "baseline", """
+    CREATE TABLE IF NOT EXISTS valorant_login(user_id bigint PRIMARY KEY NOT NULL, username text NOT NULL, password bytea NOT NULL, region text NOT NULL);
+    CREATE TABLE IF NOT EXISTS devmode(user_id bigint, enabled boolean);
+    CREATE TABLE IF NOT EXISTS skins(uuid text PRIMARY KEY NOT NULL, displayName text not null, displayIcon text, cost int, contentTierUUID text, levels jsonb, chromas jsonb);
+    CREATE TABLE IF NOT EXISTS prefixes(guild_id bigint PRIMARY KEY NOT NULL, prefix text NOT NULL);
+    CREATE TABLE IF NOT EXISTS wishlist(user_id bigint NOT NULL, skin_uuid text NOT NULL);
+    CREATE TABLE IF NOT EXISTS store_reminder(user_id bigint not null, enabled bool default false not null, show_immediately bool default false not null, picture_mode bool default false not null);
+    CREATE TABLE IF NOT EXISTS cached_stores(user_id bigint not null, store_date date default CURRENT_DATE not null,  skin1_uuid text not null, skin2_uuid text not null, skin3_uuid text not null, skin4_uuid text not null);
+    CREATE TABLE IF NOT EXISTS duck_messages(send_date date not null, message text not null);
+    CREATE TABLE IF NOT EXISTS user_settings(user_id bigint not null PRIMARY KEY, currency text, show_username bool not null default true);
+    CREATE TABLE IF NOT EXISTS onetimestores(user_id bigint not null, store_date date default CURRENT_DATE not null, skin1_uuid text not null, skin2_uuid text not null, skin3_uuid text not null, skin4_uuid text not null);
+    """),
+    (2, "columns and tables missing from the baseline", """
+    ALTER TABLE cached_stores ADD COLUMN IF NOT EXISTS username text;
+    ALTER TABLE cached_stores ADD COLUMN IF NOT EXISTS time_expire bigint;
+    ALTER TABLE user_settings ADD COLUMN IF NOT EXISTS nm_reminder bool not null default false;
+    CREATE TABLE IF NOT EXISTS accessories(uuid text PRIMARY KEY NOT NULL, name text not null, theme_uuid text, display_title text, display_img text, wide_img text, long_img text, type text not null);
+    CREATE TABLE IF NOT EXISTS temptable(enabled boolean);
+    """),
+    (3, "unique constraints", """
+    DELETE FROM wishlist a USING wishlist b WHERE a.ctid < b.ctid AND a.user_id = b.user_id AND a.skin_uuid = b.skin_uuid;
+    ALTER TABLE wishlist ADD CONSTRAINT wishlist_user_skin_key UNIQUE (user_id, skin_uuid);
+    DELETE FROM store_reminder a USING store_reminder b WHERE a.ctid < b.ctid AND a.user_id = b.user_id;
+    ALTER TABLE store_reminder ADD CONSTRAINT store_reminder_user_id_key UNIQUE (user_id);
+    DELETE FROM cached_stores a USING cached_stores b WHERE a.ctid < b.ctid AND a.username = b.username AND a.store_date = b.store_date;
+    ALTER TABLE cached_stores ADD CONSTRAINT cached_stores_username_date_key UNIQUE (username, store_date);
+    """),
+    (4, "indexes for hot queries", """
+    -- pg_trgm needs superuser or CREATE on the database, without it accessory search runs without its index
+    DO $$
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+        RAISE WARNING 'pg_trgm could not be created (%), accessories_name_trgm_idx is skipped', SQLERRM;
+    END $$;
+    CREATE INDEX IF NOT EXISTS cached_stores_date_user_idx ON cached_stores (store_date, user_id);
+    CREATE INDEX IF NOT EXISTS skins_lower_displayname_idx ON skins (lower(displayname));
+    CREATE INDEX IF NOT EXISTS skins_lower_uuid_idx ON skins (lower(uuid));
+    CREATE INDEX IF NOT EXISTS accessories_name_idx ON accessories (name);
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+            CREATE INDEX IF NOT EXISTS accessories_name_trgm_idx ON accessories USING gin (name gin_trgm_ops);
+        END IF;
+    END $$;
+    CREATE INDEX IF NOT EXISTS onetimestores_user_id_idx ON onetimestores (user_id);
+    CREATE INDEX IF NOT EXISTS store_reminder_enabled_idx ON store_reminder (user_id) WHERE enabled;
+    CREATE INDEX IF NOT EXISTS devmode_user_id_idx ON devmode (user_id);
+    """),
+    (5, "notify on config changes", """
+    CREATE OR REPLACE FUNCTION notify_config_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('config_changed', TG_TABLE_NAME);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS temptable_config_changed ON temptable;
+    CREATE TRIGGER temptable_config_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON temptable
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_config_changed();
+    DROP TRIGGER IF EXISTS devmode_config_changed ON devmode;
+    CREATE TRIGGER devmode_config_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON devmode
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_config_changed();
+    """),
+    (6, "exchange rate snapshot", """
+    CREATE TABLE IF NOT EXISTS exchange_rates(id smallint PRIMARY KEY NOT NULL CHECK (id = 1), rates jsonb not null, fetched_at timestamptz not null);
+    """),
+    (7, "themes", """
+    CREATE TABLE IF NOT EXISTS themes(uuid text PRIMARY KEY NOT NULL, name text not null, display_icon text);
+    """),
+    # already created by the baseline on databases migrated before they were split out of it
+    (8, "catalog sources", """
+    CREATE TABLE IF NOT EXISTS catalog_sources(url text PRIMARY KEY NOT NULL, etag text, last_modified text, client_version text, fetched_at timestamptz not null default now());
+    """),
+    (9, "reminder runs", """
+    CREATE TABLE IF NOT EXISTS reminder_runs(run_date date PRIMARY KEY NOT NULL, started_at timestamptz not null default now(), finished_at timestamptz, sent int not null default 0, failed int not null default 0);
+    """),
+    (10, "reminder deliveries", """
+    CREATE TABLE IF NOT EXISTS reminder_deliveries(user_id bigint not null, reminder_date date not null, status text not null, PRIMARY KEY(user_id, reminder_date));
+    """),
+    (11, "scheduled jobs", """
+    CREATE TABLE IF NOT EXISTS scheduled_jobs(name text PRIMARY KEY NOT NULL, run_at timestamptz not null, payload jsonb);
+    """),
+]
+
+
+async def migrate(pool: asyncpg.Pool) -> List[int]:
+    """Applies every pending migration, each in its own transaction, and returns the versions that were applied."""
+    applied_now = []
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK)
+        try:
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema_migrations(version int PRIMARY KEY NOT NULL, name text not null, applied_at timestamptz not null default now())"
+            )
+            applied = {r.get("version") for r in await conn.fetch("SELECT version FROM schema_migrations")}
+            for version, name, sql in MIGRATIONS:
+                if version in applied:
+                    continue
+                async with conn.transaction():
+                    await conn.execute(sql)
+                    await conn.execute("INSERT INTO schema_migrations(version, name) VALUES ($1, $2)", version, name)
+                applied_now.append(version)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK)
+    return applied_now
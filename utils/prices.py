@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Iterable, Mapping, Optional
+
+from utils.assets import assets
+
+
+class PriceTable:
+    """
+    Local-currency prices for every VP price point in the catalog, formatted once.
+
+    VP prices only take a handful of distinct values, so the table is keyed by (currency, VP cost) rather than
+    by skin and is rebuilt as a whole when the catalog's price points, the exchange-rate snapshot or
+    ``assets/currencies.json`` change. Costs that aren't catalog prices, such as night market discounts, are
+    formatted on first use and kept until the next rebuild. Currencies priced via USD are missing from the
+    table until a rate snapshot has been set, rendering never waits for one.
+    """
+
+    def __init__(self):
+        self.costs: frozenset = frozenset()
+        # currency code -> units of that currency per USD
+        self.rates: Mapping[str, float] = {}
+        self.rates_updated: Optional[float] = None
+        self._currencies = None
+        self._vp_rates: Dict[str, float] = {}
+        self._table: Dict[str, Dict[int, str]] = {}
+
+    def set_costs(self, costs: Iterable[Optional[int]]) -> None:
+        costs = frozenset(cost for cost in costs if cost is not None)
+        if costs != self.costs:
+            self.costs = costs
+            self.rebuild()
+
+    def set_rates(self, rates: Mapping[str, float], updated: Optional[float] = None) -> None:
+        self.rates_updated = updated or time.time()
+        if rates != self.rates:
+            self.rates = rates
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        currencies = assets.currencies
+        usd = currencies.get("USD", {}).get("vp_per_dollar", 0)
+        vp_rates = {}
+        for code, currency in currencies.items():
+            if currency["vp_per_dollar"] != 0:
+                vp_rates[code] = currency["vp_per_dollar"]
+            elif self.rates.get(code):
+                vp_rates[code] = usd * self.rates[code]
+        self._table = {code: self._format_all(currencies[code], vp_rate, self.costs) for code, vp_rate in vp_rates.items()}
+        self._vp_rates = vp_rates
+        self._currencies = currencies
+
+    @staticmethod
+    def _format_all(currency: Mapping, vp_rate: float, costs: Iterable[int]) -> Dict[int, str]:
+        digits = currency["decimal_digits"]
+        symbol = currency["symbol"]
+        if digits == 0:
+            return {cost: f"{symbol} {int(cost * vp_rate):,}" for cost in costs}
+        return {cost: f"{symbol} {round(cost * vp_rate, digits):,.{digits}f}" for cost in costs}
+
+    def price(self, cost: Optional[int], currency_code: Optional[str]) -> Optional[str]:
+        """The formatted price of ``cost`` VP in the currency, or None if it can't be converted yet."""
+        if cost is None or currency_code is None:
+            return None
+        if self._currencies is not assets.currencies:
+            self.rebuild()
+        table = self._table.get(currency_code.upper())
+        if table is None:
+            return None
+        formatted = table.get(cost)
+        if formatted is None:
+            code = currency_code.upper()
+            formatted = self._format_all(self._currencies[code], self._vp_rates[code], (cost,))[cost]
+            table[cost] = formatted
+        return formatted
+
+    def __repr__(self) -> str:
+        return f"<PriceTable currencies={len(self._table)} costs={len(self.costs)} rates_updated={self.rates_updated}>"
+
+
+price_table = PriceTable()
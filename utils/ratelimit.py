@@ -0,0 +1,223 @@
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+from yarl import URL
+
+_ID_SEGMENT = re.compile(r"^[0-9a-fA-F-]{16,}$|^\d+$")
+
+
+class TokenBucket:
+    """A token bucket that callers await until a token is available."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens: float = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until: float = 0
+        self.waiting = 0
+        self.total_requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rejections = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, rate: float) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+
+    async def acquire(self, slowdown: float = 1.0) -> float:
+        """Waits for a token and returns the number of seconds spent waiting."""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            # the lock keeps waiters in FIFO order so a burst drains at the bucket rate
+            async with self._lock:
+                rate = self.rate / slowdown
+                while True:
+                    now = time.monotonic()
+                    if self.blocked_until > now:
+                        await asyncio.sleep(self.blocked_until - now)
+                        continue
+                    self._refill(rate)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self.tokens) / rate)
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        self.total_requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def block(self, seconds: float) -> None:
+        self.rejections += 1
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class _LimitedRequest:
+    """A request that waits for its token before aiohttp starts it, and with it the request's timeout."""
+
+    def __init__(self, limiter: "RiotRateLimiter", session: aiohttp.ClientSession, method: str, url, kwargs: Dict[str, Any]):
+        self._limiter = limiter
+        self._session = session
+        self._method = method
+        self._url = URL(url)
+        self._kwargs = kwargs
+        self._request = None
+
+    async def _send(self) -> aiohttp.ClientResponse:
+        if self._limiter.is_limited(self._url):
+            await self._limiter.acquire(self._url)
+        self._request = self._session.request(self._method, self._url, **self._kwargs)
+        return await self._request.__aenter__()
+
+    def __await__(self):
+        return self._send().__await__()
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        return await self._send()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._request.__aexit__(exc_type, exc, tb)
+
+
+class LimitedSession:
+    """
+    Wraps a session so that requests to Riot hosts take a token from the limiter before they are sent.
+
+    The token is taken outside of aiohttp, whose ``total`` timeout starts before its trace hooks run, so time
+    spent queued never counts against the request's timeout. Everything else is delegated to the session.
+    """
+
+    def __init__(self, limiter: "RiotRateLimiter", session: aiohttp.ClientSession):
+        self.limiter = limiter
+        self.session = session
+
+    def request(self, method: str, url, **kwargs) -> _LimitedRequest:
+        return _LimitedRequest(self.limiter, self.session, method, url, kwargs)
+
+    def get(self, url, **kwargs) -> _LimitedRequest:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> _LimitedRequest:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs) -> _LimitedRequest:
+        return self.request("PUT", url, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+class RiotRateLimiter:
+    """
+    Process-wide limiter for requests to Riot's auth and pd.{region}.a.pvp.net hosts.
+
+    Requests are grouped into token buckets by host and endpoint (ids are stripped from the path, the region
+    is part of the pd host). Sessions wrapped with ``wrap`` take a token before each request and report every
+    response through ``trace_config``. A 429 blocks its bucket for ``Retry-After`` seconds and increases a fleet-wide
+    slowdown factor, which decays back to normal as requests succeed again.
+    """
+    RIOT_HOSTS = ("riotgames.com", "pvp.net")
+
+    def __init__(
+            self,
+            host_rates: Optional[Dict[str, Tuple[float, int]]] = None,
+            default_rate: Tuple[float, int] = (10.0, 20),
+            max_slowdown: float = 8.0,
+            default_retry_after: float = 10.0,
+    ):
+        # (requests per second, burst) for each bucket of a host, hosts are matched by suffix
+        self.host_rates = host_rates or {
+            "auth.riotgames.com": (3.0, 6),
+            "entitlements.auth.riotgames.com": (3.0, 6),
+            "a.pvp.net": (15.0, 30),
+        }
+        self.default_rate = default_rate
+        self.max_slowdown = max_slowdown
+        self.default_retry_after = default_retry_after
+        self.slowdown: float = 1.0
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._trace_config: Optional[aiohttp.TraceConfig] = None
+
+    def is_limited(self, url: URL) -> bool:
+        return url.host is not None and url.host.endswith(self.RIOT_HOSTS)
+
+    @staticmethod
+    def bucket_key(url: URL) -> Tuple[str, str]:
+        segments = [s for s in url.path.split("/") if s and not _ID_SEGMENT.match(s)]
+        return url.host, "/".join(segments)
+
+    def get_bucket(self, url: URL) -> TokenBucket:
+        key = self.bucket_key(url)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            rate, capacity = next(
+                (v for host, v in self.host_rates.items() if key[0] == host or key[0].endswith(f".{host}")),
+                self.default_rate
+            )
+            bucket = self.buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    async def acquire(self, url: URL) -> float:
+        return await self.get_bucket(url).acquire(self.slowdown)
+
+    def record_response(self, url: URL, status: int, retry_after: Optional[str] = None) -> None:
+        if status == 429:
+            try:
+                seconds = float(retry_after)
+            except (TypeError, ValueError):
+                seconds = self.default_retry_after
+            self.get_bucket(url).block(seconds)
+            self.slowdown = min(self.max_slowdown, self.slowdown * 2)
+        elif status < 400 and self.slowdown > 1.0:
+            self.slowdown = max(1.0, self.slowdown * 0.95)
+
+    def wrap(self, session: aiohttp.ClientSession) -> LimitedSession:
+        """The session, with its requests to Riot hosts held until a token is available."""
+        return LimitedSession(self, session)
+
+    @property
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """A trace config that reports the responses of every Riot request of a session to this limiter."""
+        if self._trace_config is None:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_end.append(self._on_request_end)
+            # sessions with raise_for_status raise before on_request_end, error statuses only reach this hook
+            trace_config.on_request_exception.append(self._on_request_exception)
+            self._trace_config = trace_config
+        return self._trace_config
+
+    async def _on_request_end(self, session: aiohttp.ClientSession, ctx: SimpleNamespace, params: aiohttp.TraceRequestEndParams) -> None:
+        if self.is_limited(params.url):
+            self.record_response(params.url, params.response.status, params.response.headers.get("Retry-After"))
+
+    async def _on_request_exception(self, session: aiohttp.ClientSession, ctx: SimpleNamespace, params: aiohttp.TraceRequestExceptionParams) -> None:
+        if self.is_limited(params.url) and isinstance(params.exception, aiohttp.ClientResponseError):
+            headers = params.exception.headers or {}
+            self.record_response(params.url, params.exception.status, headers.get("Retry-After"))
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Queue depth and wait times for every bucket, keyed by ``host/endpoint``."""
+        return {
+            f"{host}/{endpoint}": {
+                "queued": bucket.waiting,
+                "requests": bucket.total_requests,
+                "avg_wait": bucket.total_wait / bucket.total_requests if bucket.total_requests else 0.0,
+                "max_wait": bucket.max_wait,
+                "rejections": bucket.rejections,
+            }
+            for (host, endpoint), bucket in self.buckets.items()
+        }
+
+
+riot_ratelimiter = RiotRateLimiter()
@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, Optional, Sequence
+
+from utils.assets import assets
+from utils.cache import LRUCache
+from utils.format import print_exception
+from utils.media import MediaCache
+from utils.prices import price_table
+from utils.singleflight import SingleFlight
+from utils.specialobjects import GunSkin, NightMarketGunSkin
+from utils.store_image import StoreCard, render_store_image
+
+
+class StoreRenderer:
+    """
+    Renders a store or Night Market as one picture, for reminders in picture mode and the picture button.
+
+    Pillow runs in a small process pool so drawing never blocks the gateway. Icons come from the media cache,
+    and finished pictures are kept in an LRU keyed by everything drawn on them: the skins, their prices in
+    the user's currency and which of them are wishlisted. Identical requests made while a picture is being
+    drawn wait for the same render.
+    """
+
+    def __init__(self, media: MediaCache, workers: int = 2, cache_size: int = 128):
+        self.media = media
+        self.workers = workers
+        self.cache = LRUCache(cache_size)
+        self._flights = SingleFlight()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawned rather than forked, forking a process that runs threads and an event loop isn't safe. Spawned
+            # workers re-import main.py and everything it imports before their first render, workers are kept
+            # for the lifetime of the pool so that is paid once per worker
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def _key(skin: GunSkin, currency_code: Optional[str], wishlist: Collection[str]) -> tuple:
+        if isinstance(skin, NightMarketGunSkin):
+            price, original_price, discount = skin.discounted_cost, skin.cost, skin.discounted_p
+        else:
+            price, original_price, discount = skin.cost, None, None
+        return (
+            skin.uuid, skin.displayName, skin.displayIcon, skin.contentTierUUID, price,
+            price_table.price(price, currency_code), original_price, discount, skin.uuid in wishlist
+        )
+
+    async def _icon(self, url: Optional[str]) -> Optional[bytes]:
+        if url is None:
+            return None
+        try:
+            return await self.media.get(url)
+        except Exception as e:
+            # drawn without its icon rather than failing the whole picture
+            print_exception(f"Could not download {url}: ", e)
+            return None
+
+    async def _render(self, key: tuple) -> bytes:
+        icons = await asyncio.gather(*[self._icon(icon) for _, _, icon, *_ in key])
+        cards = []
+        for (_, name, _, tier_uuid, price, local_price, original_price, discount, wishlisted), icon in zip(key, icons):
+            tier = assets.tier(tier_uuid)
+            cards.append(StoreCard(
+                name, icon, tier["color"] if tier is not None else None, price, local_price, original_price, discount, wishlisted
+            ))
+        image = await asyncio.get_running_loop().run_in_executor(self.executor, render_store_image, cards)
+        self.cache.set(key, image)
+        return image
+
+    async def render(self, skins: Sequence[GunSkin], currency_code: Optional[str] = None, wishlist: Collection[str] = ()) -> bytes:
+        """The skins drawn as one PNG, two per row, with prices in ``currency_code`` when it can be converted."""
+        key = tuple(self._key(skin, currency_code, wishlist) for skin in skins)
+        image = self.cache.get(key)
+        if image is None:
+            image = await self._flights.do(key, self._render, key)
+        return image
@@ -1,11 +1,10 @@
-import json
 from typing import Literal, Optional, Union
 
-import aiohttp
 import discord
 
 from utils.format import comma_number
-from utils.helper import get_tier_data
+from utils.assets import assets
+from utils.prices import price_table
 from utils.specialobjects import GunSkin, Accessory, Buddy, PlayerTitle, PlayerCard, Spray
 
 
@@ -167,30 +166,15 @@ def skin_embed(
         skin: GunSkin, is_in_wishlist: bool, currency: Optional[dict] = None,
         nm_p: Optional[int] = None, nm_c: Optional[int] = None, nm_s: Optional[bool] = True
     ):
-    tier_uuids = get_tier_data()
-    tier = next((x for x in tier_uuids if x["uuid"] == skin.contentTierUUID), None)
+    tier = assets.tier(skin.contentTierUUID)
     if nm_p is not None:
         cost = f"<:vp:1045605973005434940> ~~{comma_number(skin.cost)}~~ `-{nm_p}%` **{comma_number(nm_c)}**"
     else:
         cost = f"<:vp:1045605973005434940> **{comma_number(skin.cost)}**" if skin.cost is not None else "<:DVB_False:887589731515392000> Not on sale"
-    final_price = nm_c or skin.cost
-    if currency is not None and final_price is not None:
-        vp_per_dollar = currency["vp_per_dollar"]
-        if vp_per_dollar == 0:
-            with open("assets/currencies.json") as f:
-                currencies = json.load(f)
-            exch = currency["exch"]
-            vp_per_dollar = currencies["data"]["USD"]["vp_per_dollar"] * exch
-        if currency['decimal_digits'] == 0:
-            cost_rounded = int(final_price * vp_per_dollar)
-            cost_fr = comma_number(cost_rounded)
-        else:
-            cost_rounded = round(final_price * vp_per_dollar, currency['decimal_digits'])
-            # comma_number doesn't work with decimals, so we need to split the whole number
-            # and decimal and run comma_number on whole number before joining it with decimal
-            cost_fr = comma_number(int(cost_rounded)) + "." + str(cost_rounded).split(".")[1]
-
-        cost += f" *≈ {currency['symbol']} {cost_fr}*"
+    if currency is not None:
+        local_price = price_table.price(nm_c or skin.cost, currency["code"])
+        if local_price is not None:
+            cost += f" *≈ {local_price}*"
     if nm_s is True:
         embed = discord.Embed(title=skin.displayName, description=f"{cost}")
         embed.set_thumbnail(url=skin.displayIcon or "https://cdn.discordapp.com/attachments/1046947484150284390/1061895579359252531/no_image.jpg")
@@ -205,18 +189,8 @@ def skin_embed(
         embed.color = 0xDD2F45
     return embed
 
-async def accessory_embed(accessory: Accessory):
+def accessory_embed(accessory: Accessory, theme: Optional[str] = None):
     embed = discord.Embed(title=accessory.name, description="", color=2829617)
-    theme = None
-    if accessory.theme_uuid:
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(f"https://valorant-api.com/v1/themes/{accessory.theme_uuid}")
-            if response.status == 200:
-                data = await response.json()
-                if theme_name := data.get("data", {}).get("displayIcon"):
-                    theme = theme_name
-
-
     if isinstance(accessory, Buddy):
         embed.set_author(name="Coin Buddy", icon_url="https://media.discordapp.net/attachments/805604591630286918/1138737966341165127/coin_buddy.png")
         embed.set_image(url=accessory.display_img)
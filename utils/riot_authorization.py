@@ -1,19 +1,23 @@
 # Sourced and modified code from python-riot-auth by floxay
 # https://github.com/floxay/python-riot-auth
 
+import asyncio
 import contextlib
 import ctypes
 import json
 import ssl
 import sys
+import time
 import warnings
 from base64 import urlsafe_b64decode
 from secrets import token_urlsafe
 from typing import Dict, List, Optional, Sequence, Tuple, Union
 from urllib.parse import parse_qsl, urlsplit
 
-import requests
 import aiohttp
+from yarl import URL
+
+from utils.ratelimit import RiotRateLimiter, riot_ratelimiter
 
 
 class Exceptions:
@@ -87,8 +91,17 @@ class RiotAuth:
         )
     )
 
-    def __init__(self) -> None:
-        self._auth_ssl_ctx = RiotAuth.create_riot_auth_ssl_ctx()
+    DEFAULT_CLIENT_BUILD = "90.0.2.1805.3774"
+    DEFAULT_CLIENT_VERSION = "release-09.01-shipping-21-2669223"
+
+    def __init__(self, transport: Optional["RiotAuthTransport"] = None) -> None:
+        self._transport = transport
+        if transport is not None:
+            self._auth_ssl_ctx = transport.ssl_ctx
+            client_build = transport.client_build
+        else:
+            self._auth_ssl_ctx = RiotAuth.create_riot_auth_ssl_ctx()
+            client_build = RiotAuth.DEFAULT_CLIENT_BUILD
         self._cookie_jar = aiohttp.CookieJar()
         self.access_token: Optional[str] = None
         self.scope: Optional[str] = None
@@ -97,7 +110,7 @@ class RiotAuth:
         self.expires_at: int = 0
         self.user_id: Optional[str] = None
         self.entitlements_token: Optional[str] = None
-        self.RIOT_CLIENT_USER_AGENT = f"RiotClient/{get_user_agent()} %s (Windows;10;;Professional, x64)"
+        self.RIOT_CLIENT_USER_AGENT = f"RiotClient/{client_build} %s (Windows;10;;Professional, x64)"
 
     @staticmethod
     def create_riot_auth_ssl_ctx() -> ssl.SSLContext:
@@ -182,19 +195,28 @@ class RiotAuth:
         if username and password:
             self._cookie_jar.clear()
 
-        conn = aiohttp.TCPConnector(ssl=self._auth_ssl_ctx)
+        if self._transport is not None:
+            # the transport owns the pooled connector, so the session must not close it
+            conn = self._transport.connector
+            client_version = self._transport.client_version
+        else:
+            conn = aiohttp.TCPConnector(ssl=self._auth_ssl_ctx)
+            client_version = RiotAuth.DEFAULT_CLIENT_VERSION
+        rate_limiter = self._transport.rate_limiter if self._transport is not None else riot_ratelimiter
         async with aiohttp.ClientSession(
-                connector=conn, raise_for_status=True, cookie_jar=self._cookie_jar
-        ) as session:
+                connector=conn, connector_owner=self._transport is None, raise_for_status=True, cookie_jar=self._cookie_jar,
+                trace_configs=[rate_limiter.trace_config]
+        ) as raw_session:
+            session = rate_limiter.wrap(raw_session)
             # noinspection SpellCheckingInspection
             headers = {
                 "Accept-Encoding": "gzip, deflate, br, identity",
                 "Content-Type": "application/json",
                 "Host": "auth.riotgames.com",
-                "user-agent": "RiotClient/90.0.2.1805.3774 rso-auth (Windows;10;;Professional, x64) riot_client/0",
+                "user-agent": f"{self.RIOT_CLIENT_USER_AGENT % 'rso-auth'} riot_client/0",
                 "Cache-Control": "no-cache",
                 "Accept": "application/json",
-                "X-Riot-ClientVersion": "release-09.01-shipping-21-2669223"
+                "X-Riot-ClientVersion": client_version
             }
 
             # region Begin auth/Reauth
@@ -283,6 +305,37 @@ class RiotAuth:
                 self.entitlements_token = (await r.json())['entitlements_token']
             # endregion
 
+    def dump_session(self) -> Dict:
+        """
+        Serializes the tokens and auth cookies so the session can be restored later.
+        """
+        cookies = [
+            {"key": morsel.key, "value": morsel.value, "domain": morsel["domain"] or "auth.riotgames.com", "path": morsel["path"] or "/"}
+            for morsel in self._cookie_jar
+        ]
+        return {
+            "access_token": self.access_token,
+            "scope": self.scope,
+            "id_token": self.id_token,
+            "token_type": self.token_type,
+            "expires_at": self.expires_at,
+            "user_id": self.user_id,
+            "entitlements_token": self.entitlements_token,
+            "cookies": cookies,
+        }
+
+    def load_session(self, data: Dict) -> None:
+        """
+        Restores a session previously serialized with :meth:`dump_session`.
+        """
+        self.__update(**{key: val for key, val in data.items() if key != "cookies"})
+        self._cookie_jar.clear()
+        for cookie in data.get("cookies", []):
+            self._cookie_jar.update_cookies(
+                {cookie["key"]: cookie["value"]},
+                URL(f"https://{cookie['domain'].lstrip('.')}{cookie['path']}")
+            )
+
     async def reauthorize(self) -> bool:
         """
         Reauthenticate using cookies.
@@ -296,14 +349,76 @@ class RiotAuth:
             return False
 
 
-"""async def get_user_agent():
-    async with aiohttp.ClientSession() as session:
-        async with session.get("https://valorant-api.com/v1/version") as r:
-            #convert response to json
-            version_data = await r.json()
-            return version_data['data']['riotClientBuild']"""
+class RiotAuthTransport:
+    """
+    Long-lived transport shared by every RiotAuth instance of the bot.
 
-def get_user_agent():
-    response = requests.get("https://valorant-api.com/v1/version")
-    version_data = response.json()
-    return version_data['data']['riotClientBuild']
+    The Riot TLS context is built once, connections to auth.riotgames.com and
+    entitlements.auth.riotgames.com are kept alive in a single pooled connector, and the
+    client build/version is fetched from valorant-api.com in the background.
+    """
+    VERSION_URL = "https://valorant-api.com/v1/version"
+
+    def __init__(
+            self, version_ttl: int = 3600, limit_per_host: int = 20, keepalive_timeout: float = 60.0,
+            rate_limiter: RiotRateLimiter = riot_ratelimiter
+    ) -> None:
+        self.ssl_ctx: ssl.SSLContext = RiotAuth.create_riot_auth_ssl_ctx()
+        self.rate_limiter = rate_limiter
+        self.version_ttl = version_ttl
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.client_build: str = RiotAuth.DEFAULT_CLIENT_BUILD
+        self.client_version: str = RiotAuth.DEFAULT_CLIENT_VERSION
+        self.version_fetched_at: float = 0
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def connector(self) -> aiohttp.TCPConnector:
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                ssl=self.ssl_ctx,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+        return self._connector
+
+    async def start(self) -> None:
+        """Fetches the client version once and starts the background refresher."""
+        await self.refresh_version()
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def refresh_version(self) -> None:
+        try:
+            client_build, client_version = await get_client_version()
+        except Exception as e:
+            # keep using the last known version, auth still works with a slightly stale build
+            print(f"Failed to refresh Riot client version: {e}")
+            return
+        self.client_build = client_build or self.client_build
+        self.client_version = client_version or self.client_version
+        self.version_fetched_at = time.time()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.version_ttl)
+            await self.refresh_version()
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
+
+
+async def get_client_version() -> Tuple[str, str]:
+    """Returns the current ``(riotClientBuild, riotClientVersion)`` from valorant-api.com."""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        async with session.get(RiotAuthTransport.VERSION_URL) as r:
+            version_data = await r.json()
+    return version_data['data']['riotClientBuild'], version_data['data']['riotClientVersion']
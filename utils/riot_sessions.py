@@ -0,0 +1,91 @@
+import json
+import time
+from typing import Optional
+
+import aiohttp
+import aioredis
+from cryptography.fernet import InvalidToken
+
+from utils.credentials import credential_vault
+from utils.riot_authorization import RiotAuth, RiotAuthTransport, Exceptions
+from utils.singleflight import SingleFlight
+
+
+class RiotSessionCache:
+    """
+    Caches Riot sessions per Discord user in Redis, encrypted with the same Fernet key as the stored passwords.
+
+    Unexpired access tokens are reused as-is, sessions close to expiry are refreshed with the saved cookies,
+    and a full username/password authorization is only done when both fail. Without Redis nothing is cached and
+    every call authorizes with the password.
+    """
+    KEY = "riot_session:{}"
+
+    def __init__(self, redis: Optional[aioredis.Redis], transport: RiotAuthTransport, refresh_margin: int = 300, session_ttl: int = 604800):
+        self.redis = redis
+        self.transport = transport
+        self.refresh_margin = refresh_margin
+        self.session_ttl = session_ttl
+        self._inflight = SingleFlight()
+
+    async def load(self, user_id: int, username: str) -> Optional[RiotAuth]:
+        if self.redis is None:
+            return None
+        raw = await self.redis.get(self.KEY.format(user_id))
+        if raw is None:
+            return None
+        try:
+            data = json.loads(credential_vault.decrypt(raw))
+        except (InvalidToken, ValueError):
+            await self.invalidate(user_id)
+            return None
+        if data.get("username") != username:
+            # the user has since logged in with another Riot account
+            return None
+        auth = RiotAuth(self.transport)
+        auth.load_session(data["session"])
+        return auth
+
+    async def save(self, user_id: int, username: str, auth: RiotAuth) -> None:
+        if self.redis is None:
+            return
+        data = json.dumps({"username": username, "session": auth.dump_session()})
+        await self.redis.set(self.KEY.format(user_id), credential_vault.encrypt(data.encode("utf-8")), ex=self.session_ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        if self.redis is None:
+            return
+        await self.redis.delete(self.KEY.format(user_id))
+
+    async def authorize(self, user_id: int, username: str, password: str, multifactor_code: str = None) -> RiotAuth:
+        """
+        Returns an authorized RiotAuth for the user, reusing the cached session whenever possible.
+
+        Raises the same exceptions as :meth:`RiotAuth.authorize` when a password authorization is needed and fails.
+        Concurrent calls for the same Riot account share a single authorization.
+        """
+        if multifactor_code is None:
+            return await self._inflight.do(username.lower(), self._authorize, user_id, username, password)
+        return await self._authorize(user_id, username, password, multifactor_code)
+
+    async def _authorize(self, user_id: int, username: str, password: str, multifactor_code: str = None) -> RiotAuth:
+        if multifactor_code is None:
+            auth = await self.load(user_id, username)
+            if auth is not None:
+                if auth.expires_at - self.refresh_margin > time.time():
+                    return auth
+                try:
+                    reauthorized = await auth.reauthorize()
+                except (Exceptions.RiotAuthError, aiohttp.ClientError):
+                    reauthorized = False
+                if reauthorized:
+                    await self.save(user_id, username, auth)
+                    return auth
+        auth = RiotAuth(self.transport)
+        try:
+            await auth.authorize(username, password, multifactor_code=multifactor_code)
+        except Exceptions.RiotAuthenticationError:
+            await self.invalidate(user_id)
+            raise
+        await self.save(user_id, username, auth)
+        return auth
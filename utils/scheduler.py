@@ -0,0 +1,141 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import json
+import random
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from utils.format import print_exception
+
+# a handler receives the job's payload and returns when the job should run next, or None if it is done
+JobHandler = Callable[[Optional[dict]], Awaitable[Optional[datetime.datetime]]]
+
+
+class Scheduler:
+    """
+    Runs background jobs at precise instants instead of fixed-interval loops.
+
+    Jobs are persisted in the ``scheduled_jobs`` table, keyed by a unique name of the form ``kind:key`` and
+    dispatched to the handler registered for their kind. Due times are kept in an in-memory heap, so a single
+    task sleeps until the next job is due. Before a job runs its row is leased by moving ``run_at`` forward:
+    another process, or a restart while the row's original time is still in the past, will not fire it twice,
+    and a job that was interrupted by a crash fires again once its lease runs out.
+    """
+
+    def __init__(self, concurrency: int = 2, lease: float = 3600, default_jitter: float = 0):
+        self.pool: Optional[asyncpg.Pool] = None
+        self.lease = datetime.timedelta(seconds=lease)
+        self.default_jitter = default_jitter
+        self.handlers: Dict[str, JobHandler] = {}
+        self.jitters: Dict[str, float] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self._heap: List[Tuple[datetime.datetime, int, str]] = []
+        self._due: Dict[str, datetime.datetime] = {}
+        self._counter = itertools.count()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, handler: JobHandler, jitter: Optional[float] = None) -> None:
+        """Registers the handler for jobs named ``kind:<key>``, ``jitter`` seconds are added to every run time."""
+        self.handlers[kind] = handler
+        self.jitters[kind] = self.default_jitter if jitter is None else jitter
+
+    async def start(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        records = await self.pool.fetch("SELECT name, run_at FROM scheduled_jobs")
+        for record in records:
+            self._push(record.get("name"), record.get("run_at"))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self.running.values():
+            task.cancel()
+
+    def _push(self, name: str, run_at: datetime.datetime) -> None:
+        self._due[name] = run_at
+        heapq.heappush(self._heap, (run_at, next(self._counter), name))
+        self._wakeup.set()
+
+    async def schedule(self, name: str, run_at: datetime.datetime, payload: Optional[dict] = None, jitter: bool = True) -> datetime.datetime:
+        """Schedules (or moves) the job to ``run_at`` plus its kind's jitter and returns the effective run time."""
+        if jitter:
+            run_at += datetime.timedelta(seconds=random.uniform(0, self.jitters.get(name.split(":", 1)[0], self.default_jitter)))
+        await self.pool.execute(
+            "INSERT INTO scheduled_jobs(name, run_at, payload) VALUES ($1, $2, $3) "
+            "ON CONFLICT(name) DO UPDATE SET run_at = $2, payload = $3",
+            name, run_at, json.dumps(payload) if payload is not None else None
+        )
+        self._push(name, run_at)
+        return run_at
+
+    async def ensure(self, name: str, run_at: datetime.datetime, payload: Optional[dict] = None) -> datetime.datetime:
+        """Schedules the job only if it isn't scheduled yet, so restarts keep the persisted run time."""
+        if name in self._due:
+            return self._due[name]
+        return await self.schedule(name, run_at, payload)
+
+    async def cancel(self, name: str) -> None:
+        await self.pool.execute("DELETE FROM scheduled_jobs WHERE name = $1", name)
+        self._due.pop(name, None)
+
+    def next_run(self, name: str) -> Optional[datetime.datetime]:
+        return self._due.get(name)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            # drop heap entries of jobs that were cancelled or moved since they were pushed
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            run_at, _, name = self._heap[0]
+            delay = (run_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            del self._due[name]
+            if name not in self.running:
+                self.running[name] = asyncio.create_task(self._fire(name, run_at))
+
+    async def _fire(self, name: str, run_at: datetime.datetime) -> None:
+        try:
+            async with self._semaphore:
+                lease_until = datetime.datetime.now(datetime.timezone.utc) + self.lease
+                payload = await self.pool.fetchval(
+                    "UPDATE scheduled_jobs SET run_at = $3 WHERE name = $1 AND run_at = $2 RETURNING coalesce(payload, 'null'::jsonb)",
+                    name, run_at, lease_until
+                )
+                if payload is None:
+                    # moved or already fired by someone else
+                    return
+                self._push(name, lease_until)
+                handler = self.handlers.get(name.split(":", 1)[0])
+                if handler is None:
+                    print(f"No handler registered for scheduled job {name}")
+                    return
+                try:
+                    next_run = await handler(json.loads(payload))
+                except Exception as e:
+                    print_exception(f"Ignoring exception in scheduled job {name}, ", e)
+                    # retry once the lease runs out
+                    return
+                if next_run is None:
+                    await self.cancel(name)
+                else:
+                    await self.schedule(name, next_run, json.loads(payload))
+        finally:
+            self.running.pop(name, None)
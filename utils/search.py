@@ -0,0 +1,126 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from heapq import nsmallest
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lower-cases, strips accents and collapses everything that isn't a letter or digit into single spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Partition:
+    __slots__ = ('names', 'norms', 'sorted_norms', 'sorted_tokens', 'postings')
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.norms = [normalize(name) for name in names]
+        self.sorted_norms: List[Tuple[str, int]] = sorted((norm, i) for i, norm in enumerate(self.norms))
+        self.sorted_tokens: List[Tuple[str, int]] = sorted(
+            {(token, i) for i, norm in enumerate(self.norms) for token in norm.split(" ") if token}
+        )
+        self.postings: Dict[str, List[int]] = {}
+        for i, norm in enumerate(self.norms):
+            for gram in trigrams(f" {norm} "):
+                self.postings.setdefault(gram, []).append(i)
+
+    @staticmethod
+    def _prefixed(sorted_pairs: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        for pos in range(bisect_left(sorted_pairs, (prefix, -1)), len(sorted_pairs)):
+            key, i = sorted_pairs[pos]
+            if not key.startswith(prefix):
+                break
+            yield i
+
+    def search(self, query: str, limit: int) -> List[str]:
+        results: List[int] = []
+        seen = set()
+
+        def add(indexes: Iterable[int]) -> bool:
+            for i in indexes:
+                if i not in seen:
+                    seen.add(i)
+                    results.append(i)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        # 1. the whole name starts with the query
+        if add(self._prefixed(self.sorted_norms, query)):
+            return [self.names[i] for i in results]
+
+        # 2. every word of the query starts a word of the name
+        words = query.split(" ")
+        candidates = set(self._prefixed(self.sorted_tokens, words[0])) - seen
+        if len(words) > 1:
+            candidates = [
+                i for i in candidates
+                if all(any(token.startswith(word) for token in self.norms[i].split(" ")) for word in words[1:])
+            ]
+        if add(nsmallest(limit - len(results), candidates, key=self.norms.__getitem__)):
+            return [self.names[i] for i in results]
+
+        # 3. the query appears anywhere in the name
+        grams = trigrams(query)
+        if grams:
+            # the rarest trigram of the query bounds the names that can contain it
+            candidates = min((self.postings.get(gram, ()) for gram in grams), key=len)
+        else:
+            candidates = range(len(self.norms))
+        candidates = [i for i in candidates if i not in seen and query in self.norms[i]]
+        if add(nsmallest(limit - len(results), candidates, key=self.norms.__getitem__)):
+            return [self.names[i] for i in results]
+
+        # 4. typo tolerant, ranked by how many trigrams are shared with the query; only when nothing matched exactly
+        grams = trigrams(f" {query} ")
+        if not results and len(grams) >= 3:
+            shared = Counter(i for gram in grams for i in self.postings.get(gram, ()) if i not in seen)
+            similar = sorted(
+                (i for i, count in shared.items() if count / len(grams) >= 0.5),
+                key=lambda i: (-shared[i], len(self.norms[i]))
+            )
+            add(similar)
+        return [self.names[i] for i in results]
+
+
+class SearchIndex:
+    """
+    A prebuilt, ranked autocomplete index over display names.
+
+    Names can be split into partitions (for example by accessory type). Results are ranked as prefix
+    matches first, then matches at the start of a word, then substrings, then typo-tolerant trigram matches.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[Hashable]]]):
+        partitions: Dict[Optional[Hashable], List[str]] = {None: []}
+        for name, partition in entries:
+            partitions[None].append(name)
+            if partition is not None:
+                partitions.setdefault(partition, []).append(name)
+        self._partitions = {key: _Partition(names) for key, names in partitions.items()}
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "SearchIndex":
+        return cls((name, None) for name in names)
+
+    def __len__(self) -> int:
+        return len(self._partitions[None].names)
+
+    def search(self, query: str, limit: int = 25, partition: Optional[Hashable] = None) -> List[str]:
+        part = self._partitions.get(partition)
+        if part is None:
+            return []
+        query = normalize(query)
+        if not query:
+            return part.names[:limit]
+        return part.search(query, limit)
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key starts the work, every caller that arrives while it is still running
+    awaits the same future and receives the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        fut = self._calls.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = fut
+            fut.add_done_callback(lambda f: self._forget(key, f))
+        # shield so a cancelled caller doesn't cancel the work for everyone else waiting on it
+        return await asyncio.shield(fut)
+
+    def _forget(self, key: Hashable, fut: asyncio.Future) -> None:
+        if self._calls.get(key) is fut:
+            del self._calls[key]
+        if not fut.cancelled():
+            # mark the exception as retrieved even if every caller was cancelled
+            fut.exception()
@@ -1,9 +1,13 @@
-import json
+import copy
 from typing import Any, Union
 from enum import Enum, auto
 
 import asyncpg
 
+from utils import jsoncodec
+from utils.cache import reminder_config_cache, user_settings_cache
+from utils.credentials import credential_vault
+
 
 class _MissingSentinel:
     def __eq__(self, other):
@@ -29,6 +33,7 @@ class ReminderConfig:
 
     async def update(self, client):
         await client.db.execute("UPDATE store_reminder SET enabled=$1, show_immediately=$2, picture_mode=$3 WHERE user_id=$4", self.enabled, self.show_immediately, self.picture_mode, self.user_id)
+        reminder_config_cache.set(self.user_id, copy.copy(self))
 
 
 MISSING: Any = _MissingSentinel()
@@ -36,14 +41,27 @@ MISSING: Any = _MissingSentinel()
 
 class RiotUser:
 
-    __slots__ = ('user_id', 'username', 'password', 'region')
+    __slots__ = ('user_id', 'username', '_password', '_encrypted_password', 'region')
 
     def __init__(self, record: asyncpg.Record):
         self.user_id: int = record.get('user_id')
         self.username: str = record.get('username')
-        self.password: bytes = record.get('password')
+        self._password: Union[str, None] = None
+        # decrypted on first access, most lookups only need the username and region
+        self._encrypted_password: Union[bytes, None] = record.get('password')
         self.region: str = record.get('region')
 
+    @property
+    def password(self) -> str:
+        if self._password is None and self._encrypted_password is not None:
+            self._password = credential_vault.decrypt_password(self._encrypted_password)
+        return self._password
+
+    @password.setter
+    def password(self, value: str):
+        self._password = value
+        self._encrypted_password = None
+
     def from_method(self, user_id: int, username: str, password: bytes, region: str):
         self.user_id = user_id
         self.username = username
@@ -54,7 +72,7 @@ class RiotUser:
 
 class GunSkin:
 
-    __slots__ = ('uuid', 'displayName', 'cost', 'displayIcon', 'contentTierUUID', 'chromas', 'levels')
+    __slots__ = ('uuid', 'displayName', 'cost', 'displayIcon', 'contentTierUUID', '_chromas', '_levels', '_raw_chromas', '_raw_levels')
 
     def __init__(self):
         self.uuid: str = None
@@ -62,8 +80,8 @@ class GunSkin:
         self.cost: int = None
         self.displayIcon: str = None
         self.contentTierUUID: str = None
-        self.chromas: dict = None
-        self.levels: dict = None
+        self.chromas: list = None
+        self.levels: list = None
 
     def from_record(self, record: asyncpg.Record):
         self.uuid = record.get('uuid')
@@ -71,10 +89,35 @@ class GunSkin:
         self.cost = record.get('cost')
         self.displayIcon = record.get('displayicon')
         self.contentTierUUID = record.get('contenttieruuid')
-        self.chromas = json.loads(record.get('chromas'))
-        self.levels = json.loads(record.get('levels'))
+        # kept as JSON text until a variant is actually shown
+        self._raw_chromas = record.get('chromas')
+        self._raw_levels = record.get('levels')
         return self
 
+    @property
+    def chromas(self) -> list:
+        if self._chromas is None and self._raw_chromas is not None:
+            self._chromas = jsoncodec.loads(self._raw_chromas)
+            self._raw_chromas = None
+        return self._chromas
+
+    @chromas.setter
+    def chromas(self, value: list):
+        self._chromas = value
+        self._raw_chromas = None
+
+    @property
+    def levels(self) -> list:
+        if self._levels is None and self._raw_levels is not None:
+            self._levels = jsoncodec.loads(self._raw_levels)
+            self._raw_levels = None
+        return self._levels
+
+    @levels.setter
+    def levels(self, value: list):
+        self._levels = value
+        self._raw_levels = None
+
     def __repr__(self):
         return f"<GunSkin uuid={self.uuid} displayName={self.displayName} cost={self.cost} displayIcon={self.displayIcon} contentTierUUID={self.contentTierUUID}> chromas={self.chromas} levels={self.levels}"
 
@@ -88,9 +131,58 @@ class NightMarketGunSkin(GunSkin):
         self.discounted_p: float = 0
         self.discounted_cost: int = 0
 
+    def from_skin(self, skin: GunSkin):
+        for attr in GunSkin.__slots__:
+            setattr(self, attr, getattr(skin, attr))
+        return self
+
     def __repr__(self):
         return f"<NightMarketGunSkin uuid={self.uuid} displayName={self.displayName} cost={self.cost} displayIcon={self.displayIcon} contentTierUUID={self.contentTierUUID} seen={self.seen} discounted_p={self.discounted_p} discounted_cost={self.discounted_cost}> chromas={self.chromas} levels={self.levels}"
 
+class StorefrontSnapshot:
+    """
+    A parsed ``/store/v2/storefront`` response.
+
+    The daily offers, Night Market and the remaining timers of every section are read once, so the same
+    snapshot can serve the store, the Night Market and any button until its earliest section expires.
+    """
+    __slots__ = ('skins', 'skins_remaining', 'night_market', 'night_market_remaining', 'accessories_remaining', 'fetched_at')
+
+    VP_UUID = "85ad13f7-3d1b-5128-9eb2-7cd8ee0b5741"
+
+    def __init__(self, data: dict, fetched_at: float):
+        self.fetched_at: float = fetched_at
+        skin_panel = data['SkinsPanelLayout']
+        self.skins: list[str] = [skin_uuid.lower() for skin_uuid in skin_panel['SingleItemOffers']]
+        self.skins_remaining: int = skin_panel['SingleItemOffersRemainingDurationInSeconds']
+        self.night_market: Union[list[tuple], None] = None
+        self.night_market_remaining: int = 0
+        night_market = data.get("BonusStore")
+        if night_market is not None:
+            self.night_market = []
+            for item in night_market["BonusStoreOffers"]:
+                uuid: str = item["Offer"]["OfferID"].lower()
+                org_cost: int = item["Offer"]["Cost"][self.VP_UUID]
+                discounted_p: int = item["DiscountPercent"]
+                discounted_cost: int = item["DiscountCosts"][self.VP_UUID]
+                is_seen: bool = item["IsSeen"]
+                self.night_market.append((uuid, org_cost, discounted_p, discounted_cost, is_seen))
+            self.night_market_remaining = night_market["BonusStoreRemainingDurationInSeconds"]
+        self.accessories_remaining: int = data.get("AccessoryStore", {}).get("AccessoryStoreRemainingDurationInSeconds", 0)
+
+    @property
+    def expires_at(self) -> float:
+        """The time at which the first section of this storefront resets."""
+        timers = [t for t in (self.skins_remaining, self.night_market_remaining, self.accessories_remaining) if t > 0]
+        return self.fetched_at + min(timers, default=0)
+
+    def remaining(self, section_remaining: int, now: float) -> int:
+        return max(0, int(self.fetched_at + section_remaining - now))
+
+    def __repr__(self) -> str:
+        return f"<StorefrontSnapshot skins={self.skins} skins_remaining={self.skins_remaining} night_market={self.night_market is not None} expires_at={self.expires_at}>"
+
+
 class UserSetting:
     __slots__ = ('user_id', 'currency', 'show_username', 'nm_reminder')
 
@@ -105,6 +197,33 @@ class UserSetting:
 
     async def update(self, client):
         await client.db.execute("UPDATE user_settings SET currency=$1, show_username=$2, nm_reminder=$3 WHERE user_id=$4", self.currency, self.show_username, self.nm_reminder, self.user_id)
+        user_settings_cache.set(self.user_id, copy.copy(self))
+
+
+class UserContext:
+    """Everything a command needs to know about a Discord user, loaded in a single query."""
+    __slots__ = ('user_id', 'account', 'settings', 'reminder', 'wishlist', 'is_dev', 'cached_store', 'cached_store_expire', 'onetimestore')
+
+    def __init__(self, user_id: int, record):
+        self.user_id: int = user_id
+        self.account: Union[RiotUser, None] = RiotUser(record.get('account')) if record.get('account') is not None else None
+        self.settings: Union[UserSetting, None] = UserSetting(record.get('settings')) if record.get('settings') is not None else None
+        self.reminder: Union[ReminderConfig, None] = ReminderConfig(record.get('reminder')) if record.get('reminder') is not None else None
+        self.wishlist: list[str] = list(record.get('wishlist') or [])
+        self.is_dev: bool = record.get('is_dev') is True
+        cached_store = record.get('cached_store')
+        onetimestore = record.get('onetimestore')
+        self.cached_store: Union[list[str], None] = None
+        self.cached_store_expire: Union[int, None] = None
+        if cached_store is not None:
+            self.cached_store = [cached_store.get('skin1_uuid'), cached_store.get('skin2_uuid'), cached_store.get('skin3_uuid'), cached_store.get('skin4_uuid')]
+            self.cached_store_expire = cached_store.get('time_expire')
+        self.onetimestore: Union[list[str], None] = None
+        if onetimestore is not None:
+            self.onetimestore = [onetimestore.get('skin1_uuid'), onetimestore.get('skin2_uuid'), onetimestore.get('skin3_uuid'), onetimestore.get('skin4_uuid')]
+
+    def __repr__(self) -> str:
+        return f"<UserContext user_id={self.user_id} account={self.account} is_dev={self.is_dev} wishlist={len(self.wishlist)}>"
 
 
 class AccessoryType(Enum):
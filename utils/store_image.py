@@ -0,0 +1,116 @@
+"""
+Draws a store or Night Market as a single picture.
+
+Only depends on Pillow, so that it is cheap to import in the renderer's worker processes. Everything a card
+needs is passed in, including the icon's bytes, and the result is returned as PNG bytes.
+"""
+import functools
+import io
+from typing import NamedTuple, Optional, Sequence
+
+from PIL import Image, ImageDraw, ImageFont
+
+CARD_WIDTH = 512
+CARD_HEIGHT = 256
+GAP = 12
+COLUMNS = 2
+BACKGROUND = (43, 45, 49)
+CARD_BACKGROUND = (30, 31, 34)
+TEXT = (242, 243, 245)
+MUTED = (148, 155, 164)
+WISHLIST = (221, 47, 69)
+DEFAULT_TIER_COLOR = 2829617
+
+
+class StoreCard(NamedTuple):
+    name: str
+    icon: Optional[bytes]
+    tier_color: Optional[int]
+    price: Optional[int]
+    local_price: Optional[str] = None
+    # set for Night Market offers, price is then the discounted price
+    original_price: Optional[int] = None
+    discount: Optional[int] = None
+    wishlisted: bool = False
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int, bold: bool = False) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf", size)
+    except OSError:
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:  # Pillow < 10.1 has a single fixed size bitmap font
+            return ImageFont.load_default()
+
+
+def _rgb(color: Optional[int]) -> tuple:
+    color = DEFAULT_TIER_COLOR if color is None else color
+    return (color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF
+
+
+def _blend(a: tuple, b: tuple, amount: float) -> tuple:
+    return tuple(round(x + (y - x) * amount) for x, y in zip(a, b))
+
+
+def _fit(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont, width: int) -> str:
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text.rstrip() + "…"
+
+
+def _draw_card(canvas: Image.Image, card: StoreCard, x: int, y: int) -> None:
+    draw = ImageDraw.Draw(canvas)
+    tier = _rgb(card.tier_color)
+    box = (x, y, x + CARD_WIDTH - 1, y + CARD_HEIGHT - 1)
+    draw.rounded_rectangle(box, radius=14, fill=_blend(CARD_BACKGROUND, tier, 0.22),
+                           outline=WISHLIST if card.wishlisted else tier, width=4 if card.wishlisted else 2)
+    draw.rectangle((x + 14, y + 2, x + CARD_WIDTH - 15, y + 7), fill=tier)
+
+    if card.icon is not None:
+        try:
+            icon = Image.open(io.BytesIO(card.icon)).convert("RGBA")
+        except (OSError, ValueError):
+            icon = None
+        if icon is not None:
+            icon.thumbnail((CARD_WIDTH - 64, CARD_HEIGHT - 110), Image.LANCZOS)
+            canvas.alpha_composite(icon, (x + (CARD_WIDTH - icon.width) // 2, y + 22 + (CARD_HEIGHT - 110 - icon.height) // 2))
+
+    name_font = _font(24, bold=True)
+    price_font = _font(22, bold=True)
+    small_font = _font(18)
+    text_y = y + CARD_HEIGHT - 70
+    price = "Not on sale" if card.price is None else f"{card.price:,} VP"
+    price_width = draw.textlength(price, font=price_font)
+    draw.text((x + 20, text_y), _fit(draw, card.name, name_font, CARD_WIDTH - 60 - price_width), font=name_font, fill=TEXT)
+    draw.text((x + CARD_WIDTH - 20 - price_width, text_y), price, font=price_font, fill=TEXT)
+
+    line_y = text_y + 34
+    if card.local_price is not None:
+        width = draw.textlength(f"≈ {card.local_price}", font=small_font)
+        draw.text((x + CARD_WIDTH - 20 - width, line_y), f"≈ {card.local_price}", font=small_font, fill=MUTED)
+    if card.original_price is not None:
+        original = f"{card.original_price:,} VP"
+        draw.text((x + 20, line_y), original, font=small_font, fill=MUTED)
+        width = draw.textlength(original, font=small_font)
+        draw.line((x + 20, line_y + 11, x + 20 + width, line_y + 11), fill=MUTED, width=2)
+        if card.discount is not None:
+            draw.text((x + 32 + width, line_y), f"-{card.discount}%", font=small_font, fill=WISHLIST)
+    elif card.wishlisted:
+        draw.text((x + 20, line_y), "In your wishlist", font=small_font, fill=WISHLIST)
+
+
+def render_store_image(cards: Sequence[StoreCard]) -> bytes:
+    """Lays the cards out two per row and returns the picture as PNG."""
+    rows = max(1, (len(cards) + COLUMNS - 1) // COLUMNS)
+    columns = min(COLUMNS, max(1, len(cards)))
+    canvas = Image.new("RGBA", (GAP + columns * (CARD_WIDTH + GAP), GAP + rows * (CARD_HEIGHT + GAP)), BACKGROUND + (255,))
+    for i, card in enumerate(cards):
+        row, column = divmod(i, COLUMNS)
+        _draw_card(canvas, card, GAP + column * (CARD_WIDTH + GAP), GAP + row * (CARD_HEIGHT + GAP))
+    out = io.BytesIO()
+    canvas.convert("RGB").save(out, format="PNG", optimize=False, compress_level=3)
+    return out.getvalue()
@@ -0,0 +1,57 @@
+import datetime
+import time
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class WishlistMatches:
+    """
+    The wishlisted skins in every cached store of one day.
+
+    Built from a single join of ``wishlist`` against that day's ``cached_stores``, with an inverted index from
+    skin to the users who have it wishlisted and in their store. A user whose wishlist changes afterwards is
+    invalidated and falls back to reading the wishlist.
+    """
+    __slots__ = ('store_date', 'loaded_at', '_stores', '_by_user', '_by_skin', '_invalidated')
+
+    def __init__(self, store_date: datetime.date, rows: Iterable[Tuple[int, Iterable[str], Iterable[str]]]):
+        self.store_date = store_date
+        self.loaded_at: float = time.time()
+        self._stores: Dict[int, FrozenSet[str]] = {}
+        self._by_user: Dict[int, FrozenSet[str]] = {}
+        by_skin: Dict[str, set] = {}
+        for user_id, store, matches in rows:
+            self._stores[user_id] = frozenset(store)
+            matches = frozenset(matches)
+            if matches:
+                self._by_user[user_id] = matches
+                for skin_uuid in matches:
+                    by_skin.setdefault(skin_uuid, set()).add(user_id)
+        self._by_skin: Dict[str, FrozenSet[int]] = {skin_uuid: frozenset(users) for skin_uuid, users in by_skin.items()}
+        self._invalidated = set()
+
+    def __len__(self) -> int:
+        return len(self._by_user)
+
+    def covers(self, user_id: int, skin_uuids: Iterable[str]) -> bool:
+        """Whether the matches for this user are known for a store made of ``skin_uuids``."""
+        store = self._stores.get(user_id)
+        return store is not None and user_id not in self._invalidated and store.issuperset(skin_uuids)
+
+    def for_user(self, user_id: int) -> FrozenSet[str]:
+        if user_id in self._invalidated:
+            return _EMPTY
+        return self._by_user.get(user_id, _EMPTY)
+
+    def users_for(self, skin_uuid: str) -> FrozenSet[int]:
+        return self._by_skin.get(skin_uuid, _EMPTY) - self._invalidated
+
+    def users_with_matches(self) -> Iterable[int]:
+        return self._by_user.keys() - self._invalidated
+
+    def invalidate(self, user_id: int) -> None:
+        self._invalidated.add(user_id)
+
+    def __repr__(self) -> str:
+        return f"<WishlistMatches store_date={self.store_date} stores={len(self._stores)} matches={len(self._by_user)}>"